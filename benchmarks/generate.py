@@ -0,0 +1,123 @@
+"""This module generates the synthetic trees for the benchmarks, the shape
+of the tree, the filename patterns, the archives and the duplicates are
+set by the arguments, and the tree is the same for the same seed
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import io
+import logging
+import os
+import random
+import tarfile
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# the filename patterns, n is the file number and d a date
+FILE_PATTERNS = [
+    "IMG_{n:04}.jpg",
+    "Report {n} Final.docx",
+    "scan-{d}-{n}.pdf",
+    "notes_v{n}.txt",
+    "DSC{n:05}.JPG",
+    "invoiceNo{n}-2022.xlsx",
+]
+
+def generate_tree(root: str, depth: int = 3, fanout: int = 4, files: int = 10,
+        patterns: list = None, archives: float = 0.05, members: int = 10,
+        duplicates: float = 0.1, size: int = 4096, seed: int = 0) -> dict:
+    """Will build a tree of folders and files under the root
+        depth:      the levels of folders below the root
+        fanout:     the folders in each folder
+        files:      the files in each folder
+        patterns:   the filename patterns, see FILE_PATTERNS
+        archives:   the ratio of the files that are zip or tar.gz archives
+        members:    the files in each archive
+        duplicates: the ratio of the files that copy an earlier file
+        size:       the mean size of a file, in bytes
+        seed:       the random seed
+    returns the counts of the folders, files, archives, members,
+    duplicates and bytes written"""
+    rnd = random.Random(seed)
+    patterns = patterns or FILE_PATTERNS
+    stats = {
+        "folders": 0,
+        "files": 0,
+        "archives": 0,
+        "members": 0,
+        "duplicates": 0,
+        "bytes": 0
+    }
+
+    written = []
+    folders = [(root, 0)]
+    while folders:
+        folder, level = folders.pop()
+        os.makedirs(folder, exist_ok=True)
+        stats["folders"] += 1
+
+        for idx in range(files):
+            pick = rnd.random()
+            if pick < archives:
+                _write_archive(rnd=rnd, folder=folder, idx=idx, patterns=patterns,
+                        members=members, size=size, stats=stats)
+                continue
+
+            name = _get_name(rnd=rnd, patterns=patterns, idx=stats["files"])
+            if written and pick < archives + duplicates:
+                data = rnd.choice(written)
+                stats["duplicates"] += 1
+            else:
+                data = _get_data(rnd=rnd, size=size)
+                if len(written) < 100:
+                    written.append(data)
+
+            with open(os.path.join(folder, name), "wb") as f_io:
+                f_io.write(data)
+            stats["files"] += 1
+            stats["bytes"] += len(data)
+
+        if level < depth:
+            for idx in range(fanout):
+                folders.append((os.path.join(folder, f"folder_{level}_{idx}"), level + 1))
+
+    return stats
+
+def generate_phrases(count: int, patterns: list = None, seed: int = 0) -> list:
+    """return a list of the filenames, as per the tree"""
+    rnd = random.Random(seed)
+    patterns = patterns or FILE_PATTERNS
+    return [_get_name(rnd=rnd, patterns=patterns, idx=idx) for idx in range(count)]
+
+def _get_name(rnd: random.Random, patterns: list, idx: int) -> str:
+    """return a filename from a random pattern"""
+    date = "{:04}{:02}{:02}".format(rnd.randint(2000, 2022), rnd.randint(1, 12), rnd.randint(1, 28))
+    return rnd.choice(patterns).format(n=idx, d=date)
+
+def _get_data(rnd: random.Random, size: int) -> bytes:
+    """return the random bytes for a file, of about the size"""
+    length = max(1, int(rnd.expovariate(1 / size)))
+    return rnd.getrandbits(8 * length).to_bytes(length, "little")
+
+def _write_archive(rnd: random.Random, folder: str, idx: int, patterns: list,
+        members: int, size: int, stats: dict) -> None:
+    """Will write a zip or tar.gz archive of the members"""
+    items = [(_get_name(rnd=rnd, patterns=patterns, idx=m_idx), _get_data(rnd=rnd, size=size))
+            for m_idx in range(members)]
+    if rnd.random() < 0.5:
+        path = os.path.join(folder, f"archive_{idx}.zip")
+        with zipfile.ZipFile(path, "w") as z_io:
+            for m_idx, (name, data) in enumerate(items):
+                z_io.writestr(f"{m_idx}/{name}", data)
+    else:
+        path = os.path.join(folder, f"archive_{idx}.tar.gz")
+        with tarfile.open(path, "w:gz") as t_io:
+            for m_idx, (name, data) in enumerate(items):
+                info = tarfile.TarInfo(name=f"{m_idx}/{name}")
+                info.size = len(data)
+                t_io.addfile(info, io.BytesIO(data))
+
+    stats["files"] += 1
+    stats["archives"] += 1
+    stats["members"] += members
+    stats["bytes"] += os.path.getsize(path)
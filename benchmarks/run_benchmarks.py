@@ -0,0 +1,196 @@
+"""The benchmark suite, the synthetic trees are generated in a temp folder
+at each scale, the scan, profile, hash, catalog and process steps are timed,
+and the results are saved as json to be compared between commits
+    python -m benchmarks.run_benchmarks --scales small medium --output base.json
+    python -m benchmarks.run_benchmarks --compare base.json
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.path_utils import make_hash, scan_files
+from lost_cat.utils.phrase_utils import PhraseTool
+
+from benchmarks.generate import generate_phrases, generate_tree
+
+logger = logging.getLogger(__name__)
+
+# the tree shapes, the files are (fanout^(depth+1) - 1) / (fanout - 1) * files
+SCALES = {
+    "small": {"depth": 2, "fanout": 3, "files": 10},
+    "medium": {"depth": 3, "fanout": 4, "files": 20},
+    "large": {"depth": 4, "fanout": 5, "files": 40},
+}
+
+class BenchParser():
+    """A lifecycle parser that reads the file, for the process benchmark"""
+    def get_extensions(self) -> list:
+        return [".txt", ".jpg", ".pdf"]
+
+    def set_anonimizer(self, anonimizer: dict) -> None:
+        pass
+
+    def set_export_tags(self, tags: dict) -> None:
+        pass
+
+    def set_group_tags(self, tags: dict) -> None:
+        pass
+
+    def set_alias_tags(self, tags: dict) -> None:
+        pass
+
+    def parse(self, uri: str = None, bytes_io: object = None) -> dict:
+        if bytes_io is None:
+            with open(uri, "rb") as f_io:
+                data = f_io.read()
+        else:
+            data = bytes_io.read()
+        return {
+            "metadata": {"size": len(data)},
+            "grouping": {"first": data[:1].hex()}
+        }
+
+    def close(self) -> None:
+        pass
+
+def run_benchmarks(scales: list, repeat: int = 3, seed: int = 0) -> dict:
+    """return the results of the benchmarks for each of the scales, the
+    time is the best of the repeats"""
+    results = []
+    for scale in scales:
+        root = tempfile.mkdtemp(prefix=f"lost_cat_{scale}_")
+        try:
+            tree = generate_tree(root=root, seed=seed, **SCALES[scale])
+            logger.info("%s: %s", scale, tree)
+            results.extend(_run_scale(scale=scale, root=root, tree=tree, repeat=repeat,
+                    seed=seed))
+        finally:
+            shutil.rmtree(root)
+
+    return {
+        "commit": _get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results
+    }
+
+def _run_scale(scale: str, root: str, tree: dict, repeat: int, seed: int) -> list:
+    """return the timed benchmarks for the generated tree"""
+    files = [f.get("path") for f in scan_files(root)]
+    phrases = generate_phrases(count=tree.get("files"), seed=seed)
+
+    def catalog(options: dict) -> LostCat:
+        lc_obj = LostCat(options=options)
+        lc_obj.add_source(label="bench", uri=root)
+        lc_obj.catalog_artifacts()
+        return lc_obj
+
+    def cataloged() -> tuple:
+        # the catalog for the process run, built outside the timing
+        lc_obj = catalog(options={"profile": True})
+        lc_obj.add_parser(label="bench", base_class=BenchParser)
+        return (lc_obj,)
+
+    # (<name>, <count>, <func>, <setup>), the setup returns the args of the func
+    benches = [
+        ("scan_files", len(files), lambda: list(scan_files(root)), None),
+        ("scan_files_stats", len(files), lambda: list(scan_files(root, options={"stats": True})),
+            None),
+        ("phrase_get_metadata", len(phrases),
+            lambda: [PhraseTool(in_phrase=p).get_metadata() for p in phrases], None),
+        ("make_hash", len(files), lambda: [make_hash(uri=f) for f in files], None),
+        ("catalog_artifacts", len(files), lambda: catalog(options={"profile": True, "stats": True}),
+            None),
+        ("catalog_artifacts_scandir", len(files),
+            lambda: catalog(options={"profile": True, "stats": True, "scandir": True}), None),
+        ("process_artifacts", len(files), lambda lc_obj: lc_obj.process_artifacts(), cataloged),
+    ]
+
+    results = []
+    for name, count, func, setup in benches:
+        seconds = _time(func=func, repeat=repeat, setup=setup)
+        results.append({
+            "name": name,
+            "scale": scale,
+            "count": count,
+            "seconds": seconds,
+            "rate": count / seconds if seconds else None
+        })
+        logger.info("%s %s: %.4fs", scale, name, seconds)
+
+    return results
+
+def compare(base: dict, current: dict) -> list:
+    """return the ratio of the current to the base time for each benchmark,
+    as [(<scale>, <name>, <base>, <current>, <ratio>), ...]"""
+    base_times = {(r.get("scale"), r.get("name")): r.get("seconds") for r in base.get("results")}
+    rows = []
+    for result in current.get("results"):
+        key = (result.get("scale"), result.get("name"))
+        if key in base_times:
+            rows.append((*key, base_times[key], result.get("seconds"),
+                    result.get("seconds") / base_times[key] if base_times[key] else None))
+    return rows
+
+def _time(func: object, repeat: int, setup: object = None) -> float:
+    """return the best time of the repeats, the setup, if set, is run
+    before each repeat and returns the args of the func, the profile
+    cache is cleared so each repeat starts cold"""
+    best = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        PhraseTool.get_cache().clear()
+        start = time.perf_counter()
+        func(*args)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+def _get_commit() -> str:
+    """return the git commit of the source, if known"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                text=True, check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(args: list = None) -> int:
+    """run the benchmarks from the command line"""
+    parser = argparse.ArgumentParser(description="lost_cat benchmarks")
+    parser.add_argument("--scales", nargs="+", default=["small"], choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="the json file to save the results to")
+    parser.add_argument("--compare", help="the json results to compare to")
+    p_args = parser.parse_args(args)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+    results = run_benchmarks(scales=p_args.scales, repeat=p_args.repeat, seed=p_args.seed)
+
+    if p_args.output:
+        with open(p_args.output, "w", encoding="utf-8") as f_io:
+            json.dump(results, f_io, indent=2)
+
+    if p_args.compare:
+        with open(p_args.compare, "r", encoding="utf-8") as f_io:
+            base = json.load(f_io)
+        for scale, name, base_time, cur_time, ratio in compare(base=base, current=results):
+            ratio = "   n/a" if ratio is None else f"{ratio:6.2f}x"
+            print(f"{scale:8} {name:28} {base_time:9.4f}s {cur_time:9.4f}s {ratio}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
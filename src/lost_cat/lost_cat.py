@@ -1,9 +1,28 @@
 """
 Lost cat will scan and process a range of files
 """
+import asyncio
+import contextvars
+import itertools
 import os
 import logging
-from .utils.path_utils import build_path, scan_files, func_switch_zip
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .utils.checkpoint_utils import CHECKPOINT_INTERVAL, Checkpoint
+from .utils.column_utils import CatalogColumns
+from .utils.dedup_utils import find_duplicates
+from .utils.group_utils import GroupIndex
+from .utils.index_utils import ScanIndex
+from .utils.instrument_utils import build_instrument, instrumented
+from .utils.parse_utils import build_pool, build_units, close_parsers, count_parse_files
+from .utils.parse_utils import run_units
+from .utils.path_utils import build_path, count_files, get_artifact_key
+from .utils.path_utils import scan_entries, scan_files, scan_files_parallel
+from .utils.profile_utils import ProfileIndex
+from .utils.progress_utils import build_progress
+from .utils.report_utils import REPORT_COLUMNS, build_summary
+from .utils.record_utils import FileRecord
+from .utils.store_utils import ArtifactStore, build_store
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +44,9 @@ class ParserAlreadyExists(Exception):
 class ScannerAlreadyExists(Exception):
     """A simple exception to raise already exist error"""
 
+class CheckpointNotFound(Exception):
+    """A simple exception to raise a missing checkpoint error"""
+
 class ParserFailedToLoad(Exception):
     """A simple exception to raise already exist error"""
     def __init__(self, label: str, base_class: str, message: str) -> None:
@@ -70,14 +92,25 @@ class LostCat():
                 "profile": True
             }
 
-        # a local store for the disovered artifacts
+        # a local store for the disovered artifacts, an in-memory
+        # dict unless a "store" option is set, see build_store
         self._artifacts = {
-            "files": dict()
+            "files": build_store(options=self._options)
         }
 
         # a place to store the processed artifacts, organized
-        # by the grouping, and with metadata...
-        self._catalog = dict()
+        # by the grouping, and with metadata, see GroupIndex...
+        self._catalog = GroupIndex()
+
+        # an inverted index of the filename profile to the files
+        self._profiles = ProfileIndex()
+
+        # the stage timings of the runs, a no-op unless the
+        # "instrument" option is set, see build_instrument
+        self._instrument = build_instrument(options=self._options)
+
+        # set by resume, the runs continue from the checkpoint
+        self._resuming = False
 
     def add_source(self, label: str, uri: str, overwrite: bool = False) -> dict:
         """It parse the provided source path and
@@ -134,122 +167,509 @@ class LostCat():
                     base_class=base_class) from ex
 
     def load_catalog(self, catalog: dict) -> None:
-        """Will load a dictionary as the catalog"""
-        self._artifacts = catalog
+        """Will load a dictionary as the catalog, if a artifact store is
+        in use the files are loaded into the store"""
+        files = self._artifacts.get("files")
+        if not isinstance(files, ArtifactStore):
+            self._artifacts = catalog
+        else:
+            files.clear()
+            for path, file_obj in catalog.get("files", {}).items():
+                files[path] = file_obj
+            files.flush()
+
+            self._artifacts = dict(catalog, files=files)
+
+        self._profiles = ProfileIndex.from_files(files=self._artifacts.get("files", {}))
 
     def fetch_catalog(self) -> dict:
-        """Will load a dictionary as the catalog"""
+        """Will return the catalog, if a artifact store is in use
+        the "files" is the store, and is streamed as it is read"""
         return self._artifacts
 
+    def fetch_columns(self, names: list = None) -> CatalogColumns:
+        """Will return the cataloged files as columns, only the named
+        columns if passed, see column_utils"""
+        return CatalogColumns.from_files(files=self._artifacts.get("files", {}), names=names)
+
+    def export_catalog(self, uri: str, compression: str = None) -> dict:
+        """Will save the cataloged files to the folder as column files,
+        compressed with "gzip", "bz2" or "lzma" if set, returns the manifest"""
+        return self.fetch_columns().save(uri=uri, compression=compression)
+
+    def import_catalog(self, uri: str, use_mmap: bool = True) -> None:
+        """Will load the catalog from the column files saved by export_catalog"""
+        columns = CatalogColumns.load(uri=uri, use_mmap=use_mmap)
+        self.load_catalog(catalog={"files": columns.to_files()})
+
+    def fetch_groups(self) -> GroupIndex:
+        """Will return the parsed files by the grouping, see GroupIndex"""
+        return self._catalog
+
+    def close(self) -> None:
+        """Will close the artifact store, if one is in use"""
+        files = self._artifacts.get("files")
+        if isinstance(files, ArtifactStore):
+            files.close()
+
+    def fetch_stats(self) -> dict:
+        """Will return the stage counts and timings of the instrumented runs"""
+        return self._instrument.get_stats()
+
+    @instrumented("catalog")
     def catalog_artifacts(self) -> dict:
         """Will scan the sources and load a dictionary with the found files,
         it'll use the template list for extensions to use.
+        if the "parallel" option is set the folders are walked by a pool
+        of workers, see scan_files_parallel for the options, the "scandir"
+        option uses the os.scandir walker
+        if the "index" option is set to a file path the run is incremental,
+        the unchanged files since the last run are taken from the index, and
+        the added, modified and deleted counts are returned
+        if the "compact" option is set the files are held as FileRecord,
+        see record_utils, in place of the file dicts
+        if the "progress" option is set the progress events are sent as
+        the files are found, see progress_utils.build_progress
+        if the "checkpoint" option is set to a file path the folders still
+        to walk, the finished folders and the found files are saved to it
+        every "checkpointinterval" seconds, default 30, see resume, the
+        folders are walked with scandir, the "parallel" option is ignored
         <<for web addresses, it'll need a scraper built>>"""
+        index = self._open_index()
+        checkpoint = self._open_checkpoint(run="catalog")
+        progress = self._build_progress(run="catalog")
+        file_added = 0
+        zip_added = 0
+        try:
+            for fnd_file in self._scan_sources(index=index, checkpoint=checkpoint):
+                if index and index.is_modified(path=fnd_file.get("path")):
+                    self._drop_modified(path=fnd_file.get("path"))
+                _, f_added, z_added = self._add_found(fnd_file=fnd_file)
+                file_added += f_added
+                zip_added += z_added
+                progress.update(size=fnd_file.get("size"), folder=fnd_file.get("folder"))
+
+            if checkpoint:
+                checkpoint.set_state(run="catalog", state="done")
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        result = {
+            "files": file_added,
+            "zipped": zip_added,
+        }
+        progress.finish()
+        self._close_index(index=index, result=result)
+        result["cataloged"] = len(self._artifacts.get("files"))
+        return result
+
+    def resume(self, process: bool = None) -> dict:
+        """Will continue the runs from the file set by the "checkpoint"
+        option, the LostCat is set up with the sources, parsers and options
+        of the stopped run, the found files are loaded from the checkpoint
+        and only the folders not finished are walked, then, if process is
+        set, or the stopped run had started to process, the parsed files
+        are loaded and only the files not parsed are parsed
+        returns the catalog counts, and the "processed" count of the files
+        by ext if the files are processed"""
+        uri = self._options.get("checkpoint")
+        if not uri or not os.path.exists(uri):
+            raise CheckpointNotFound
+
+        checkpoint = Checkpoint(uri=uri, options=self._options)
+        state = checkpoint.get_state(run="process")
+        checkpoint.close()
+
+        self._resuming = True
+        try:
+            result = self.catalog_artifacts()
+            if process or (process is None and state):
+                result["processed"] = self.process_artifacts()
+        finally:
+            self._resuming = False
+        return result
+
+    def _open_checkpoint(self, run: str) -> Checkpoint:
+        """return the checkpoint, if the "checkpoint" option is set, the
+        checkpoint of the run is cleared unless the run is resumed"""
+        if not self._options.get("checkpoint"):
+            return None
+
+        checkpoint = Checkpoint(uri=self._options.get("checkpoint"), options=self._options,
+                interval=self._options.get("checkpointinterval", CHECKPOINT_INTERVAL))
+        if not self._resuming:
+            checkpoint.clear(run=run)
+        checkpoint.set_state(run=run, state="started")
+        return checkpoint
+
+    def _open_index(self) -> ScanIndex:
+        """return the scan index, if the "index" option is set"""
+        if not self._options.get("index"):
+            return None
+
+        # the records hold the dates as epoch seconds
+        s_options = dict(self._options, epoch=True) if self._options.get("compact") \
+                else self._options
+        return ScanIndex(uri=self._options.get("index"), options=s_options)
+
+    def _scan_sources(self, index: ScanIndex = None, checkpoint: Checkpoint = None) -> dict:
+        """Will walk the folder sources with the scanner set by the options,
+        yields the found files, as FileRecord if "compact" is set
+        with a checkpoint the files found by the earlier runs are yielded
+        first, and the scandir walker is used from the checkpoint frontier,
+        the "parallel" option is not used with a checkpoint"""
+        scanner = scan_files
+        compact = self._options.get("compact")
+        s_options = dict(self._options, epoch=True) if compact else self._options
+        s_kwargs = {}
+        if index:
+            scanner = scan_entries
+            s_kwargs["index"] = index
+        elif self._options.get("parallel"):
+            scanner = scan_files_parallel
+        elif self._options.get("scandir"):
+            scanner = scan_entries
+
+        if checkpoint:
+            if self._options.get("parallel"):
+                logger.warning("The parallel walker is not checkpointed, using scandir for %s",
+                        checkpoint)
+            scanner = scan_entries
+            s_kwargs["checkpoint"] = checkpoint
+
+        for uri in self._source_uris():
+            found = scanner(uri, options=s_options, **s_kwargs)
+            if checkpoint:
+                found = itertools.chain(checkpoint.iter_files(uri=uri), found)
+
+            for fnd_file in found:
+                if compact:
+                    fnd_file = FileRecord.from_dict(file_dict=fnd_file, options=self._options)
+                yield fnd_file
+
+    def _source_uris(self) -> list:
+        """return the paths of the folder sources"""
+        return [os.path.join(uri_obj.get("root"), *uri_obj.get("folders",[]))
+                for uri_obj in self._sources.values() if uri_obj.get("type") in ["folder"]]
+
+    def _build_progress(self, run: str, files: dict = None, skip: set = None) -> object:
+        """return the progress of the run, for a catalog run the files are
+        counted first if the "precount" progress option is set, for a
+        process run the files to parse are counted, if passed"""
+        config = self._options.get("progress")
+        total = None
+        if config and files is not None:
+            total = count_parse_files(files=files, parse_ext=self._parse_ext, skip=skip)
+        elif run == "catalog" and isinstance(config, dict) and config.get("precount"):
+            total = sum(count_files(uri=uri, options=self._options) for uri in self._source_uris())
+        return build_progress(run=run, options=self._options, total=total)
+
+    def _add_found(self, fnd_file: dict) -> tuple:
+        """Will add the found file, and the archive members, to the catalog
+        returns the dict of the file and members by key, and the count of
+        the added files and members"""
+        files = self._artifacts["files"]
+        found = {fnd_file.get("path"): fnd_file}
         file_added = 0
         zip_added = 0
-        for _, uri_obj in self._sources.items():
-            if uri_obj.get("type") not in ["folder"]:
-                continue
-
-            uri = os.path.join(uri_obj.get("root"), *uri_obj.get("folders",[]))
 
-            for fnd_file in scan_files(uri, options=self._options):
-                # process the returned files...
-                if not fnd_file.get("path","") in self._artifacts.get("files", {}):
-                    file_added +=1
-                    self._artifacts["files"][fnd_file.get("path")] = fnd_file
+        # process the returned files...
+        if not fnd_file.get("path","") in files:
+            file_added +=1
+            files[fnd_file.get("path")] = fnd_file
+            self._profiles.add(key=fnd_file.get("path"), file_dict=fnd_file)
+
+        for zip_file in fnd_file.get("files",{}) :
+            z_key = get_artifact_key(file_dict=zip_file)
+            found[z_key] = zip_file
+            if not z_key in files:
+                zip_added +=1
+                files[z_key] = zip_file
+
+        return found, file_added, zip_added
+
+    def _close_index(self, index: ScanIndex, result: dict) -> None:
+        """Will drop the deleted files from the catalog, add the index
+        counts to the result and close the index"""
+        if not index:
+            return
+
+        self._drop_deleted(deleted=index.get_deleted())
+        result.update(index.get_counts())
+        index.close()
+
+    def _drop_deleted(self, deleted: list) -> None:
+        """Will drop the deleted files, and their members, from the catalog"""
+        for del_file in deleted:
+            self._drop_file(file_dict=del_file)
+
+    def _drop_modified(self, path: str) -> None:
+        """Will drop the catalog entry of the modified file, and the members
+        if it is an archive, so the rescanned file is added in its place"""
+        file_dict = self._artifacts["files"].get(path)
+        if file_dict is not None:
+            self._drop_file(file_dict=file_dict)
+
+    def _drop_file(self, file_dict: dict) -> None:
+        """Will drop the file, and its archive members, from the catalog"""
+        for zip_file in file_dict.get("files") or []:
+            self._artifacts["files"].pop(get_artifact_key(file_dict=zip_file), None)
+        self._artifacts["files"].pop(file_dict.get("path"), None)
+        self._profiles.remove(key=file_dict.get("path"), file_dict=file_dict)
+
+    def query_profile(self, short: str, folder: str = None) -> list:
+        """return the keys of the files with the short filename profile,
+        e.g. "TLI", and in or under the folder if passed"""
+        return self._profiles.query(short=short, folder=folder)
+
+    def profile_report(self, n: int = 10) -> list:
+        """return the n most frequent filename profiles,
+        as [(<short>, <count>), ...]"""
+        return self._profiles.top(n=n)
+
+    @instrumented("dedup")
+    def find_duplicates(self) -> dict:
+        """Will find the duplicate files and archive members in the catalog,
+        the files are grouped by size, then by a sample hash, or the zip crc,
+        and only the remaining collisions are fully hashed, see
+        dedup_utils.find_duplicates for the options and the report"""
+        return find_duplicates(files=self._artifacts.get("files", {}), options=self._options)
+
+    def summary_report(self) -> dict:
+        """Will return the summary of the catalog, the size histogram, the
+        totals per ext and folder, the age buckets and the largest files,
+        computed over the catalog columns, see report_utils.build_summary
+        for the options and the report"""
+        return build_summary(columns=self.fetch_columns(names=REPORT_COLUMNS),
+                options=self._options)
+
+    @instrumented("process")
+    def process_artifacts(self) -> dict:
+        """Will scan the loaded files into the catalog and apply the PARSER
+        the archive members are grouped by archive and parsed after the
+        files, so each archive is opened once, the open archives are held
+        in a pool sized by the "archivepool" option
+        the members are streamed to the parsers, a parser with the
+        random_access attribute set gets a seekable copy, held in memory
+        up to the "spoolsize" option and then spilled to a temp file
+        the compressed tars are read in a single pass, as they're
+        decompressed, unless the "tarstream" option is False
+        the nested archives are opened in the pool by the composite path
+        if the "parseworkers" option is set the files, in chunks of the
+        "parsechunk" option, and the archives are parsed in a pool of
+        processes, the results are merged in the same order as a serial run
+        if the "progress" option is set the progress events are sent as
+        the files are parsed, see progress_utils.build_progress
+        if the "checkpoint" option is set the parser results are saved to
+        it, and on resume the parsed files are not parsed again, the files
+        of a unit stopped part way are parsed again"""
+        files = self._artifacts.get("files", {})
+        checkpoint = self._open_checkpoint(run="process")
+        try:
+            parsed = self._load_processed(checkpoint=checkpoint)
+            data = {}
+            for f_ext in parsed.values():
+                data[f_ext] = data.get(f_ext, 0) + 1
+            units = build_units(files=files, parse_ext=self._parse_ext, options=self._options,
+                    data=data, skip=parsed)
+            progress = self._build_progress(run="process", files=files, skip=parsed)
+
+            for f_key, md_objs in run_units(units=units, context=self._parse_context()):
+                file_obj = files[f_key]
+                for md_obj in md_objs:
+                    self._add_metadata(file_obj=file_obj, md_obj=md_obj)
+                files[f_key] = file_obj
+                if checkpoint:
+                    checkpoint.add_processed(key=f_key, md_objs=md_objs)
+                progress.update(size=file_obj.get("size"), folder=file_obj.get("folder"))
+
+            if checkpoint:
+                checkpoint.set_state(run="process", state="done")
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        progress.finish()
+        return data
 
-                for zip_file in fnd_file.get("files",{}) :
-                    if not zip_file.get("path","") in self._artifacts.get("files", {}):
-                        zip_added +=1
-                        self._artifacts["files"][zip_file.get("path")] = zip_file
+    def _load_processed(self, checkpoint: Checkpoint = None) -> dict:
+        """Will add the parser results saved in the checkpoint to the files
+        returns the ext of the parsed files by key"""
+        parsed = {}
+        if not checkpoint:
+            return parsed
 
-        cat_cnt = len(self._artifacts.get("files"))
+        files = self._artifacts.get("files", {})
+        for f_key, md_objs in checkpoint.iter_processed():
+            if f_key not in files:
+                continue
+            file_obj = files[f_key]
+            for md_obj in md_objs:
+                self._add_metadata(file_obj=file_obj, md_obj=md_obj)
+            files[f_key] = file_obj
+            parsed[f_key] = file_obj.get("ext", "<>")
+        return parsed
+
+    def _parse_context(self) -> dict:
+        """return the parsers and tags to run the parse units, see parse_utils"""
         return {
-            "files": file_added,
-            "zipped": zip_added,
-            "cataloged": cat_cnt
+            "parsers": {ext: [(p_label, self._parsers.get(p_label,{}).get("class"))
+                    for p_label in labels if self._parsers.get(p_label,{}).get("class")]
+                for ext, labels in self._parse_ext.items()},
+            "tags": {
+                "anonimizer": self._anonimizer,
+                "export": self._tags_exp,
+                "group": self._group_tags,
+                "alias": self._set_alias_tags
+            },
+            "options": self._options
         }
 
-    def process_artifacts(self) -> dict:
-        """Will scan the loaded files into the catalog and apply the PARSER"""
-        z_path = None
-        z_ext = None
-        zip_obj = None
-
-        data = {}
-
-        # scan the files and zips...
-        for _, file_obj in self._artifacts.get("files", {}).items():
-            f_ext = file_obj.get("ext","<>")
-            if f_ext not in data:
-                data[f_ext] = 0
-            data[f_ext] += 1
-
-            # scan using the template function
-            for p_label in self._parse_ext.get(f_ext, []):
-                cls = self._parsers.get(p_label,{}).get("class")
-                if not cls:
-                    continue
-
-                if "zipfile" in file_obj:
-                    if file_obj.get("zipfile") != z_path:
-                        z_path = file_obj.get("zipfile")
-                        _, z_ext = os.path.splitext(z_path)
-                        z_ext = z_ext.lower()
-                        z_func = func_switch_zip(ext=z_ext, op_label="open")
-
-                        logger.debug(z_path)
-                        logger.debug(z_func)
-                        zip_obj = z_func(uri=z_path)
-
-                    if zip_obj:
-                        bytes_io = func_switch_zip(ext=z_ext, op_label="fetch")(
-                                file_obj=zip_obj, item_path=file_obj.get("path"))
-                        obj = cls(bytes_io=bytes_io)
-                else:
-                    obj = cls(uri=file_obj.get("path"))
-
-                logger.debug("Running Class %s -> %s", p_label, cls)
-
-                # load the anonimizer
-                obj.set_anonimizer(anonimizer=self._anonimizer)
-                obj.set_export_tags(tags=self._tags_exp)
-                obj.set_group_tags(tags=self._group_tags)
-                obj.set_alias_tags(tags=self._set_alias_tags)
-
-                md_obj = obj.get_metadata()
-
-                # fetch the metadata...
-                if "metadata" not in file_obj:
-                    file_obj["metadata"] = {}
-
-                for mt, mv in md_obj.get("metadata", {}).items():
-                    file_obj["metadata"][mt] = mv
-
-                if "grouping" not in file_obj:
-                    file_obj["grouping"] = {}
-
-                for gt, gv in md_obj.get("grouping", {}).items():
-                    file_obj["grouping"][gt] = gv
-
-                # close th file
-                obj.close()
-
-                # save the items to the catalog by walking the group tree
-                cur_node = self._catalog
-                logger.debug(file_obj)
-
-                # pivot into the grouping structure...
-                for gt, gv in md_obj.get("grouping", {}).items():
-                    if not gv:
-                        gv = "<missing>"
-                    if gv not in cur_node:
-                        cur_node[gv] = {}
-                    cur_node = cur_node.get(gv)
-
-                # save the file item at the botto,
-                cur_node["files"]  = []
-                cur_node["files"].append(file_obj)
+    @instrumented("pipeline")
+    def run_pipeline(self) -> dict:
+        """Will scan, catalog and parse the sources as a single streamed run,
+        see pipeline, returns the catalog counts and the "processed" count
+        of the files by ext"""
+        return asyncio.run(self.pipeline())
+
+    async def pipeline(self) -> dict:
+        """Will scan, catalog and parse the sources in stages joined by
+        queues, so the parsing starts on the first files found, the queues
+        are bounded by the "pipelinequeue" option, default 1000, so a slow
+        stage holds back the stages before it
+            scan:       the scanner is run in a thread, as per catalog_artifacts
+            catalog:    the found files are added to the catalog, and grouped
+                        into the parse units
+            parse:      the units are run in a thread, or in the pool of
+                        processes set by the "parseworkers" option, and the
+                        metadata merged into the files
+        the parse order, unlike process_artifacts, is the completion order
+        the progress events, if set, are sent for the "catalog" and the
+        "process" stages with the depths of the queues"""
+        loop = asyncio.get_running_loop()
+        q_size = self._options.get("pipelinequeue") or 1000
+        found_q = asyncio.Queue(maxsize=q_size)
+        unit_q = asyncio.Queue(maxsize=q_size)
+
+        c_progress = self._build_progress(run="catalog")
+        p_progress = self._build_progress(run="process")
+        for progress in [c_progress, p_progress]:
+            progress.add_queue(name="found", depth=found_q.qsize)
+            progress.add_queue(name="units", depth=unit_q.qsize)
+
+        context = self._parse_context()
+        pool, workers, func = build_pool(context=context)
+        result = {
+            "files": 0,
+            "zipped": 0,
+            "processed": {}
+        }
 
-        return data
+        stop = threading.Event()
+
+        def scan() -> tuple:
+            # the index is used in the scan thread, the deleted files are
+            # returned to be dropped from the catalog
+            index = self._open_index()
+            try:
+                for fnd_file in self._scan_sources(index=index):
+                    if stop.is_set():
+                        return None
+                    asyncio.run_coroutine_threadsafe(found_q.put(fnd_file), loop).result()
+
+                if index:
+                    return list(index.get_deleted()), index.get_counts()
+                return None
+            finally:
+                if index:
+                    index.close()
+                asyncio.run_coroutine_threadsafe(found_q.put(None), loop).result()
+
+        async def catalog() -> None:
+            chunk_size = self._options.get("parsechunk") or 64
+            pending = {}
+            while True:
+                fnd_file = await found_q.get()
+                if fnd_file is not None:
+                    found, f_added, z_added = self._add_found(fnd_file=fnd_file)
+                    result["files"] += f_added
+                    result["zipped"] += z_added
+                    pending.update(found)
+                    c_progress.update(size=fnd_file.get("size"), folder=fnd_file.get("folder"))
+                    if len(pending) < chunk_size and len(found) == 1:
+                        continue
+
+                for unit in build_units(files=pending, parse_ext=self._parse_ext,
+                        options=self._options, data=result["processed"]):
+                    await unit_q.put(unit)
+                pending = {}
+
+                if fnd_file is None:
+                    c_progress.finish()
+                    for _ in range(workers):
+                        await unit_q.put(None)
+                    return
+
+        async def parse() -> None:
+            files = self._artifacts["files"]
+            while True:
+                unit = await unit_q.get()
+                if unit is None:
+                    return
+
+                for f_key, md_objs in await loop.run_in_executor(pool, func, unit):
+                    file_obj = files[f_key]
+                    for md_obj in md_objs:
+                        self._add_metadata(file_obj=file_obj, md_obj=md_obj)
+                    files[f_key] = file_obj
+                    p_progress.update(size=file_obj.get("size"), folder=file_obj.get("folder"))
+
+        s_pool = ThreadPoolExecutor(max_workers=1)
+        scan_fut = loop.run_in_executor(s_pool, contextvars.copy_context().run, scan)
+        tasks = [asyncio.ensure_future(catalog())] + \
+                [asyncio.ensure_future(parse()) for _ in range(workers)]
+        try:
+            deleted = (await asyncio.gather(scan_fut, *tasks))[0]
+        except BaseException:
+            # stop the stages, and empty the queue the scan may be blocked on
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            while not scan_fut.done():
+                while not found_q.empty():
+                    found_q.get_nowait()
+                await asyncio.sleep(0.01)
+            raise
+        finally:
+            s_pool.shutdown(wait=True)
+            if not self._options.get("parseworkers"):
+                pool.submit(close_parsers).result()
+            pool.shutdown(wait=True)
+
+        p_progress.finish()
+        if deleted:
+            self._drop_deleted(deleted=deleted[0])
+            result.update(deleted[1])
+
+        result["cataloged"] = len(self._artifacts.get("files"))
+        return result
+
+    def _add_metadata(self, file_obj: dict, md_obj: dict) -> None:
+        """Will add the metadata and grouping from the parser to the file,
+        and add the file to the catalog"""
+        # fetch the metadata...
+        if "metadata" not in file_obj:
+            file_obj["metadata"] = {}
+
+        for mt, mv in md_obj.get("metadata", {}).items():
+            file_obj["metadata"][mt] = mv
+
+        if "grouping" not in file_obj:
+            file_obj["grouping"] = {}
+
+        for gt, gv in md_obj.get("grouping", {}).items():
+            file_obj["grouping"][gt] = gv
+
+        # save the file to the bucket for the grouping
+        self._catalog.add(grouping=md_obj.get("grouping", {}), file_obj=file_obj)
@@ -0,0 +1,192 @@
+"""A module for the run checkpoint, the checkpoint persists the folders
+still to walk, the finished folders, the found files and the parsed files
+of a run, so a run that stops can be resumed from the last checkpoint
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import json
+import logging
+import sqlite3
+import time
+
+from lost_cat.utils.index_utils import INDEX_OPTIONS
+from lost_cat.utils.store_utils import to_json
+
+logger = logging.getLogger(__name__)
+
+# the seconds between the checkpoint writes
+CHECKPOINT_INTERVAL = 30.0
+
+class Checkpoint():
+    """A sqlite backed checkpoint of a catalog and process run
+        roots:      the source folders, and if the walk is finished
+        frontier:   the folders found and not finished, per root
+        folders:    the finished folders
+        files:      the found files, per root, as returned by the walker
+        processed:  the parser results of the parsed files, by key
+    the changes are held and written together at most once per interval,
+    so a folder is only finished once its files are written, the folder
+    in progress when a run stops is walked again on resume"""
+    def __init__(self, uri: str, options: dict = None,
+            interval: float = CHECKPOINT_INTERVAL) -> None:
+        """Open, or create, the checkpoint file"""
+        self._uri = uri
+        self._interval = interval
+        self._conn = sqlite3.connect(uri)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, done INTEGER)")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS frontier (
+                root TEXT,
+                folder TEXT,
+                PRIMARY KEY (root, folder))""")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY)")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                root TEXT,
+                data TEXT)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_root ON files (root)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS processed (key TEXT PRIMARY KEY, data TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # clear the checkpoint if the options have changed
+        opt_sig = json.dumps({k: (options or {}).get(k) for k in INDEX_OPTIONS},
+                sort_keys=True, default=str)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'options'").fetchone()
+        if row and row[0] != opt_sig:
+            logger.info("Checkpoint %s options changed, clearing", uri)
+            self.clear()
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('options', ?)", (opt_sig,))
+        self._conn.commit()
+
+        self._root = None
+        self._files = []
+        self._finished = []
+        self._frontier = []
+        self._processed = []
+        self._next = time.monotonic() + interval
+
+    def __str__(self):
+        return f"Checkpoint <{self._uri}>"
+
+    def get_counts(self) -> dict:
+        """return the count of the frontier and finished folders, and
+        the found and processed files"""
+        self.commit()
+        return {table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ["frontier", "folders", "files", "processed"]}
+
+    def get_state(self, run: str) -> str:
+        """return the state of the run, "started", "done" or None"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (run,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, run: str, state: str) -> None:
+        """Will save the state of the run"""
+        self.commit()
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (run, state))
+        self._conn.commit()
+
+    def open_root(self, uri: str) -> list:
+        """return the folders to walk for the source folder, the frontier
+        of the last checkpoint, the folder for a new source, or none if the
+        walk of the source is finished"""
+        self.commit()
+        self._root = uri
+        row = self._conn.execute("SELECT done FROM roots WHERE root = ?", (uri,)).fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO roots VALUES (?, 0)", (uri,))
+            self._conn.execute("INSERT INTO frontier VALUES (?, ?)", (uri, uri))
+            self._conn.commit()
+            return [uri]
+        if row[0]:
+            return []
+
+        return [r[0] for r in self._conn.execute(
+                "SELECT folder FROM frontier WHERE root = ? ORDER BY rowid", (uri,))]
+
+    def add_file(self, file_dict: dict) -> None:
+        """Will add a found file of the open source folder"""
+        self._files.append((file_dict.get("path"), self._root,
+                json.dumps(file_dict, default=to_json)))
+
+    def finish_folder(self, uri: str, sub_folders: list) -> None:
+        """Will mark the folder as finished, and add the sub folders, in
+        the order they're walked, to the frontier"""
+        self._finished.append(uri)
+        self._frontier.extend(reversed(sub_folders))
+        self._maybe_commit()
+
+    def finish_root(self, uri: str) -> None:
+        """Will mark the walk of the source folder as finished"""
+        self.commit()
+        self._conn.execute("UPDATE roots SET done = 1 WHERE root = ?", (uri,))
+        self._conn.execute("DELETE FROM frontier WHERE root = ?", (uri,))
+        self._conn.commit()
+        self._root = None
+
+    def iter_files(self, uri: str) -> dict:
+        """yield the found files of the source folder"""
+        self.commit()
+        for row in self._conn.execute("SELECT data FROM files WHERE root = ? ORDER BY rowid",
+                (uri,)):
+            yield json.loads(row[0])
+
+    def add_processed(self, key: str, md_objs: list) -> None:
+        """Will add the parser results of the file"""
+        self._processed.append((key, json.dumps(md_objs, default=str)))
+        self._maybe_commit()
+
+    def iter_processed(self) -> tuple:
+        """yield the (<key>, [<md_obj>, ...]) of the parsed files"""
+        self.commit()
+        for row in self._conn.execute("SELECT key, data FROM processed ORDER BY rowid"):
+            yield row[0], json.loads(row[1])
+
+    def clear(self, run: str = None) -> None:
+        """Will clear the checkpoint, or only the state of the run,
+        "catalog" or "process", the catalog includes the process"""
+        self._files = []
+        self._finished = []
+        self._frontier = []
+        self._processed = []
+        tables = ["roots", "frontier", "folders", "files", "processed"]
+        runs = ["catalog", "process"]
+        if run == "process":
+            tables = ["processed"]
+            runs = ["process"]
+
+        for table in tables:
+            self._conn.execute(f"DELETE FROM {table}")
+        self._conn.executemany("DELETE FROM meta WHERE key = ?", [(r,) for r in runs])
+        self._conn.commit()
+
+    def commit(self) -> None:
+        """Will write the held changes"""
+        self._next = time.monotonic() + self._interval
+        if not (self._files or self._finished or self._frontier or self._processed):
+            return
+
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", self._files)
+            self._conn.executemany("INSERT OR IGNORE INTO frontier VALUES (?, ?)",
+                    [(self._root, folder) for folder in self._frontier])
+            self._conn.executemany("DELETE FROM frontier WHERE root = ? AND folder = ?",
+                    [(self._root, folder) for folder in self._finished])
+            self._conn.executemany("INSERT OR IGNORE INTO folders VALUES (?)",
+                    [(folder,) for folder in self._finished])
+            self._conn.executemany("INSERT OR REPLACE INTO processed VALUES (?, ?)",
+                    self._processed)
+
+        self._files = []
+        self._finished = []
+        self._frontier = []
+        self._processed = []
+
+    def close(self) -> None:
+        """Will write the held changes and close the checkpoint file"""
+        self.commit()
+        self._conn.close()
+
+    def _maybe_commit(self) -> None:
+        """Will write the held changes if the interval has passed"""
+        if time.monotonic() >= self._next:
+            self.commit()
@@ -0,0 +1,328 @@
+"""This module provides the columnar catalog, the files are held as a
+column per key, the numbers and labels as typed arrays, and can be saved
+to a folder of column files, and loaded back memory mapped
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import array
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import math
+import mmap
+import os
+import sys
+import time
+
+from lost_cat.utils.path_utils import TIME_FORMAT
+from lost_cat.utils.store_utils import to_json
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+COLUMN_FORMAT = 1
+MANIFEST = "manifest.json"
+
+# the column kinds, and the missing value
+#   "int":      int64, -1
+#   "float":    float64, nan
+#   "bool":     int8, -1
+#   "label":    int32 codes into the list of labels, -1
+#   "text":     utf-8 joined on NUL, with a int8 valid flag if any are missing
+CATALOG_COLUMNS = {
+    "key": "text",
+    "type": "bool",
+    "zipfile": "label",
+    "path": "text",
+    "root": "label",
+    "folder": "label",
+    "file": "text",
+    "name": "text",
+    "ext": "label",
+    "accessed": "float",
+    "modified": "float",
+    "created": "float",
+    "size": "int",
+    "mode": "int",
+    "crc": "int",
+    # the other keys of the file, as json
+    "extra": "text",
+}
+
+DATE_COLUMNS = ("accessed", "modified", "created")
+
+# the array typecodes, the files are little endian
+TYPECODES = {"int": "q", "float": "d", "bool": "b", "label": "i", "valid": "b"}
+DTYPES = {"q": "<i8", "d": "<f8", "b": "i1", "i": "<i4"}
+
+COMPRESSION = {
+    "gzip": (gzip.open, ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "lzma": (lzma.open, ".xz"),
+}
+
+class CompressionNotHandled(Exception):
+    """A simple exception to raise for an unknown compression"""
+    def __init__(self, label: str, message: str) -> None:
+        self.label = label
+        self.message = message
+        super().__init__()
+
+class CatalogColumns():
+    """The catalog files held as columns, the numeric columns are numpy
+    arrays if numpy is installed, else array or memoryview, e.g.
+        cols = CatalogColumns.from_files(files)
+        cols.save(uri, compression="gzip")
+        cols = CatalogColumns.load(uri)
+        sizes = cols.column("size")
+        exts = cols.labels("ext")
+    the dates are held as epoch seconds, and formatted again by to_files
+    if the catalog had the formatted dates"""
+    def __init__(self, count: int, columns: dict, labels: dict, epoch: bool = True) -> None:
+        self._count = count
+        self._columns = columns
+        self._labels = labels
+        self._epoch = epoch
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def epoch(self) -> bool:
+        """True if the dates were epoch seconds in the catalog"""
+        return self._epoch
+
+    @classmethod
+    def from_files(cls, files: dict, names: list = None) -> "CatalogColumns":
+        """return the columns for a dict, or store, of the files, if the
+        names are passed only those columns are built, e.g. for a report,
+        and the columns can't be saved"""
+        kinds = {name: kind for name, kind in CATALOG_COLUMNS.items()
+                if names is None or name in names}
+        dates = [name for name in DATE_COLUMNS if name in kinds]
+        with_extra = "extra" in kinds
+        values = {name: [] for name in kinds}
+        codes = {name: {} for name, kind in kinds.items() if kind == "label"}
+        epoch = True
+        count = 0
+        for key, file_dict in files.items():
+            count += 1
+            row = {"key": key}
+            extra = {}
+            for name, value in file_dict.items():
+                if name in CATALOG_COLUMNS and name not in ("key", "extra"):
+                    row[name] = value
+                elif with_extra:
+                    extra[name] = value
+
+            for name in dates:
+                if isinstance(row.get(name), str):
+                    epoch = False
+                    row[name] = time.mktime(time.strptime(row[name], TIME_FORMAT))
+
+            if extra:
+                row["extra"] = json.dumps(extra, default=to_json)
+
+            for name, kind in kinds.items():
+                value = row.get(name)
+                if kind == "label" and value is not None:
+                    value = codes[name].setdefault(value, len(codes[name]))
+                values[name].append(value)
+
+        columns = {}
+        for name, kind in kinds.items():
+            if kind == "text":
+                columns[name] = _pack_text(values=values[name])
+            else:
+                columns[name] = _to_array(typecode=TYPECODES[kind],
+                        values=_fill(kind=kind, values=values[name]))
+
+        return cls(count=count, columns=columns, epoch=epoch,
+                labels={name: list(label_codes) for name, label_codes in codes.items()})
+
+    @classmethod
+    def load(cls, uri: str, use_mmap: bool = True) -> "CatalogColumns":
+        """return the columns saved in the folder, the uncompressed
+        numeric columns are memory mapped unless use_mmap is False"""
+        with open(os.path.join(uri, MANIFEST), "r", encoding="utf-8") as f_io:
+            manifest = json.load(f_io)
+
+        compression = manifest.get("compression")
+        count = manifest.get("count")
+        columns = {}
+        for name, info in manifest.get("columns").items():
+            path = os.path.join(uri, info.get("file"))
+            if info.get("kind") == "text":
+                valid = None
+                if info.get("valid"):
+                    valid = _read_array(path=os.path.join(uri, info.get("valid")),
+                            typecode=TYPECODES["valid"], count=count,
+                            compression=compression, use_mmap=use_mmap)
+                columns[name] = (_read(path=path, compression=compression), valid)
+            else:
+                columns[name] = _read_array(path=path, typecode=TYPECODES[info.get("kind")],
+                        count=count, compression=compression, use_mmap=use_mmap)
+
+        return cls(count=count, columns=columns, labels=manifest.get("labels"),
+                epoch=manifest.get("epoch"))
+
+    def save(self, uri: str, compression: str = None) -> dict:
+        """Will save the columns as files in the folder, compressed with
+        "gzip", "bz2" or "lzma" if set, the compressed files can't be
+        memory mapped on load, returns the manifest"""
+        if compression and compression not in COMPRESSION:
+            raise CompressionNotHandled(label=compression, message="Compression not implemented!")
+
+        os.makedirs(uri, exist_ok=True)
+        suffix = COMPRESSION[compression][1] if compression else ""
+        manifest = {
+            "format": COLUMN_FORMAT,
+            "count": self._count,
+            "epoch": self._epoch,
+            "compression": compression,
+            "columns": {},
+            "labels": self._labels,
+        }
+
+        for name, kind in CATALOG_COLUMNS.items():
+            info = {"kind": kind}
+            if kind == "text":
+                text, valid = self._columns[name]
+                info["file"] = f"{name}.txt{suffix}"
+                _write(path=os.path.join(uri, info["file"]), data=text, compression=compression)
+                if valid is not None:
+                    info["valid"] = f"{name}.valid.bin{suffix}"
+                    _write(path=os.path.join(uri, info["valid"]), data=_to_bytes(valid),
+                            compression=compression)
+            else:
+                info["file"] = f"{name}.bin{suffix}"
+                _write(path=os.path.join(uri, info["file"]),
+                        data=_to_bytes(self._columns[name]), compression=compression)
+            manifest["columns"][name] = info
+
+        with open(os.path.join(uri, MANIFEST), "w", encoding="utf-8") as f_io:
+            json.dump(manifest, f_io)
+
+        return manifest
+
+    def column(self, name: str) -> object:
+        """return the array for a numeric column, or the codes for a
+        label column, the missing values are -1, or nan for the dates"""
+        if CATALOG_COLUMNS.get(name) == "text":
+            raise TypeError(f"{name} is a text column, use to_list")
+        return self._columns[name]
+
+    def labels(self, name: str) -> list:
+        """return the labels for the codes of a label column"""
+        return self._labels[name]
+
+    def to_list(self, name: str) -> list:
+        """return the column as a list of the values, None if missing"""
+        kind = CATALOG_COLUMNS[name]
+        if kind == "text":
+            text, valid = self._columns[name]
+            values = text.decode("utf-8").split("\0") if self._count else []
+            if valid is not None:
+                values = [v if f else None for v, f in zip(values, valid)]
+            return values
+
+        values = self._columns[name].tolist()
+        if kind == "label":
+            labels = self._labels[name]
+            return [labels[v] if v >= 0 else None for v in values]
+        if kind == "float":
+            return [None if math.isnan(v) else v for v in values]
+        if kind == "bool":
+            return [None if v < 0 else bool(v) for v in values]
+        return [None if v < 0 else v for v in values]
+
+    def to_files(self) -> dict:
+        """return the dict of the files, as from_files was passed"""
+        rows = [{} for _ in range(self._count)]
+        for name in CATALOG_COLUMNS:
+            if name in ("key", "extra"):
+                continue
+
+            values = self.to_list(name)
+            if name in DATE_COLUMNS and not self._epoch:
+                values = [None if v is None else time.strftime(TIME_FORMAT, time.localtime(v))
+                        for v in values]
+            for row, value in zip(rows, values):
+                if value is not None:
+                    row[name] = value
+
+        for row, extra in zip(rows, self.to_list("extra")):
+            if extra is not None:
+                row.update(json.loads(extra))
+
+        return dict(zip(self.to_list("key"), rows))
+
+def _fill(kind: str, values: list) -> list:
+    """return the values with the missing value set"""
+    if kind == "float":
+        return [math.nan if v is None else float(v) for v in values]
+    if kind == "bool":
+        return [-1 if v is None else int(bool(v)) for v in values]
+    return [-1 if v is None else int(v) for v in values]
+
+def _pack_text(values: list) -> tuple:
+    """return the text column, as the joined utf-8 and the valid flags"""
+    valid = None
+    if any(v is None for v in values):
+        valid = _to_array(typecode=TYPECODES["valid"], values=[int(v is not None) for v in values])
+        values = ["" if v is None else v for v in values]
+    return "\0".join(values).encode("utf-8"), valid
+
+def _to_array(typecode: str, values: list) -> object:
+    """return the values as a numpy array, or a array if not installed"""
+    if numpy is not None:
+        return numpy.array(values, dtype=DTYPES[typecode])
+    return array.array(typecode, values)
+
+def _to_bytes(values: object) -> bytes:
+    """return the little endian bytes of the array"""
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.astype(values.dtype.newbyteorder("<")).tobytes()
+
+    if sys.byteorder == "big":
+        values = array.array(values.typecode if isinstance(values, array.array)
+                else values.format, values)
+        values.byteswap()
+    return bytes(values)
+
+def _write(path: str, data: bytes, compression: str = None) -> None:
+    """write the data to the file, compressed if set"""
+    opener = COMPRESSION[compression][0] if compression else open
+    with opener(path, "wb") as f_io:
+        f_io.write(data)
+
+def _read(path: str, compression: str = None) -> bytes:
+    """return the data in the file, uncompressed"""
+    opener = COMPRESSION[compression][0] if compression else open
+    with opener(path, "rb") as f_io:
+        return f_io.read()
+
+def _read_array(path: str, typecode: str, count: int, compression: str = None,
+        use_mmap: bool = True) -> object:
+    """return the array in the file, memory mapped if possible"""
+    if use_mmap and not compression and count and sys.byteorder == "little":
+        if numpy is not None:
+            return numpy.memmap(path, dtype=DTYPES[typecode], mode="r", shape=(count,))
+        with open(path, "rb") as f_io:
+            return memoryview(mmap.mmap(f_io.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+
+    data = _read(path=path, compression=compression)
+    if numpy is not None:
+        return numpy.frombuffer(data, dtype=DTYPES[typecode])
+
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
@@ -0,0 +1,173 @@
+"""This module provides the duplicate detection for the catalog, the files
+are grouped by size, then by a sample hash of the first and last bytes,
+or the zip crc, and only the remaining collisions are fully hashed
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import hashlib
+import logging
+import os
+
+from lost_cat.utils.hash_utils import hash_stream
+from lost_cat.utils.path_utils import ArchivePool
+
+logger = logging.getLogger(__name__)
+
+# the bytes read from the start and end of the file for the sample hash
+DEDUP_SAMPLE = 64 * 1024
+
+def find_duplicates(files: dict, options: dict = None) -> dict:
+    """Will find the duplicate files and archive members in the files dict,
+    options:
+        "dedupsample":  the bytes sampled from the start and end, 64 KiB
+        "dedupminsize": the smallest file checked, default 1 byte
+        "dedupalgos":   the hashes for the full hash, default blake2b
+    returns:
+        {
+            "groups": [{"size": int, "hash": dict, "files": [<key>, ...]}, ...],
+            "duplicates": the count of the redundant copies,
+            "wasted": the bytes of the redundant copies,
+            "stats": the count of the files at each stage, and bytes read
+        }
+    """
+    if not options:
+        options = {}
+
+    sample = options.get("dedupsample", DEDUP_SAMPLE)
+    min_size = options.get("dedupminsize", 1)
+    algos = options.get("dedupalgos") or ["blake2b"]
+    stats = {
+        "files": 0,
+        "sized": 0,
+        "sampled": 0,
+        "hashed": 0,
+        "bytes": 0
+    }
+
+    # stage 1: group on the size, the size is only stat'd if missing
+    sizes = {}
+    for key, file_dict in files.items():
+        stats["files"] += 1
+        size = _get_size(file_dict=file_dict)
+        if size is None or size < min_size:
+            continue
+
+        if size not in sizes:
+            sizes[size] = []
+        sizes[size].append((key, file_dict.get("zipfile"), file_dict.get("path"),
+                file_dict.get("crc")))
+
+    groups = []
+    with ArchivePool(size=options.get("archivepool", 4)) as pool:
+        for size, items in sizes.items():
+            if len(items) < 2:
+                continue
+            stats["sized"] += len(items)
+
+            # stage 2: the zip crc if all are zip members, else a sample hash
+            if all(item[3] is not None for item in items):
+                samples = _group(items=items, func=lambda item: item[3])
+                covered = False
+            else:
+                samples = _group(items=items, func=lambda item: _sample_hash(
+                        pool=pool, item=item, size=size, sample=sample, stats=stats))
+                stats["sampled"] += len(items)
+                covered = size <= 2 * sample
+
+            for s_key, s_items in samples.items():
+                if len(s_items) < 2 or s_key is None:
+                    continue
+
+                # the sample covers the whole file
+                if covered:
+                    groups.append({"size": size, "hash": None,
+                            "files": [item[0] for item in s_items]})
+                    continue
+
+                # stage 3: the full hash of the remaining collisions
+                stats["hashed"] += len(s_items)
+                hashes = _group(items=s_items, func=lambda item: _full_hash(
+                        pool=pool, item=item, size=size, algos=algos, stats=stats))
+                for h_key, h_items in hashes.items():
+                    if len(h_items) > 1 and h_key is not None:
+                        groups.append({"size": size, "hash": dict(h_key),
+                                "files": [item[0] for item in h_items]})
+
+    return {
+        "groups": groups,
+        "duplicates": sum(len(g.get("files")) - 1 for g in groups),
+        "wasted": sum(g.get("size") * (len(g.get("files")) - 1) for g in groups),
+        "stats": stats
+    }
+
+def _get_size(file_dict: dict) -> int:
+    """return the size of the file, stat'ing the file if it's missing"""
+    size = file_dict.get("size")
+    if size is None and "zipfile" not in file_dict:
+        try:
+            size = os.stat(file_dict.get("path")).st_size
+        except (OSError, TypeError):
+            return None
+    return size
+
+def _group(items: list, func: object) -> dict:
+    """group the items on the key returned by the func, the archive members
+    are processed together so each archive is opened once"""
+    groups = {}
+    for item in sorted(items, key=lambda item: (item[1] or "", item[2] or "")):
+        key = func(item)
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(item)
+    return groups
+
+def _open(pool: ArchivePool, item: tuple) -> object:
+    """return the open file, or archive member, for the item"""
+    _, zipfile, path, _ = item
+    if zipfile:
+        return pool.fetch(uri=zipfile, item_path=path)
+    return open(path, "rb")
+
+def _sample_hash(pool: ArchivePool, item: tuple, size: int, sample: int, stats: dict) -> str:
+    """return the hash of the first and last sample bytes, a stream that
+    can't seek is read through to the end"""
+    hasher = hashlib.blake2b()
+    try:
+        with _open(pool=pool, item=item) as f_io:
+            data = f_io.read(sample)
+            hasher.update(data)
+            stats["bytes"] += len(data)
+
+            if size > 2 * sample and f_io.seekable():
+                f_io.seek(size - sample)
+                data = f_io.read(sample)
+                stats["bytes"] += len(data)
+            elif size > sample:
+                tail = b""
+                while True:
+                    data = f_io.read(sample)
+                    if not data:
+                        break
+                    stats["bytes"] += len(data)
+                    tail = (tail + data)[-sample:]
+                data = tail
+            hasher.update(data)
+
+    except (OSError, KeyError) as ex:
+        logger.error('ERROR: [%s]\n%s', item[0], ex)
+        return None
+
+    return hasher.hexdigest()
+
+def _full_hash(pool: ArchivePool, item: tuple, size: int, algos: list, stats: dict) -> tuple:
+    """return the full hash of the file, as a sortable tuple"""
+    try:
+        with _open(pool=pool, item=item) as f_io:
+            hashes = hash_stream(f_io=f_io, algorithms=algos)
+            stats["bytes"] += size
+
+    except (OSError, KeyError) as ex:
+        logger.error('ERROR: [%s]\n%s', item[0], ex)
+        return None
+
+    return tuple(sorted(hashes.items()))
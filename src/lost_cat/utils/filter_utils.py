@@ -0,0 +1,179 @@
+"""This module provides the file filter, the "filter" option is compiled
+once into the sets and patterns, so the walkers can test the names before
+the metadata, profile and hash work, and skip the pruned folders
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import fnmatch
+import functools
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# the format of the after and before dates, if not epoch seconds
+DATE_FORMAT = "%Y-%m-%d"
+
+def get_filter(options: dict = None) -> "FileFilter":
+    """return the compiled filter for the "filter" option, or None if not
+    set, the filter is compiled once for the config"""
+    config = (options or {}).get("filter")
+    if not config:
+        return None
+
+    return _compile_filter(json.dumps(config, sort_keys=True, default=str))
+
+@functools.lru_cache(maxsize=16)
+def _compile_filter(config: str) -> "FileFilter":
+    """return the compiled filter for the json of the filter config"""
+    return FileFilter(config=json.loads(config))
+
+class FileFilter():
+    """The compiled file filter, a file is included if it matches all the
+    set conditions, the config is:
+        "exts":         the extensions to include, e.g. [".txt", ".pdf"]
+        "excludeexts":  the extensions to exclude
+        "regex":        a regex the file name must match
+        "names":        the globs, one of which the file name must match
+        "excludenames": the globs of the file names to exclude
+        "pathregex":    a regex the full path must match
+        "paths":        the globs, one of which the full path must match
+        "excludepaths": the globs of the full paths to exclude
+        "minsize":      the smallest file size, in bytes
+        "maxsize":      the largest file size, in bytes
+        "after":        the earliest modified date, epoch or "YYYY-MM-DD"
+        "before":       the latest modified date, epoch or "YYYY-MM-DD"
+        "prune":        the globs of the folder names not walked, e.g. ".git"
+        "prunepaths":   the globs of the folder paths not walked
+    the name and path tests are run on the listed names, before the file
+    is stat'd, the size and date tests only if they are set"""
+    def __init__(self, config: dict) -> None:
+        self._exts = _get_set(config.get("exts"))
+        self._exclude_exts = _get_set(config.get("excludeexts")) or set()
+        self._name_re = re.compile(config.get("regex")) if config.get("regex") else None
+        self._names = _get_globs(config.get("names"))
+        self._exclude_names = _get_globs(config.get("excludenames"))
+        self._path_re = re.compile(config.get("pathregex")) if config.get("pathregex") else None
+        self._paths = _get_globs(config.get("paths"))
+        self._exclude_paths = _get_globs(config.get("excludepaths"))
+        self._min_size = config.get("minsize")
+        self._max_size = config.get("maxsize")
+        self._after = _get_time(config.get("after"))
+        self._before = _get_time(config.get("before"))
+        self._prune = _get_globs(config.get("prune"))
+        self._prune_paths = _get_globs(config.get("prunepaths"))
+
+        self.needs_stat = any(v is not None for v in
+                [self._min_size, self._max_size, self._after, self._before])
+        self.prunes = bool(self._prune or self._prune_paths)
+
+    def include_name(self, name: str, path: str) -> bool:
+        """return True if the file name and path pass the filter"""
+        ext = os.path.splitext(name)[1].lower()
+        if self._exts is not None and ext not in self._exts:
+            return False
+        if ext in self._exclude_exts:
+            return False
+        if self._name_re and not self._name_re.match(name):
+            return False
+        if self._names and not self._names.match(name):
+            return False
+        if self._exclude_names and self._exclude_names.match(name):
+            return False
+        if self._path_re and not self._path_re.match(path):
+            return False
+        if self._paths and not self._paths.match(path):
+            return False
+        if self._exclude_paths and self._exclude_paths.match(path):
+            return False
+        return True
+
+    def include_stat(self, size: int, mtime: float) -> bool:
+        """return True if the file size and modified date pass the filter"""
+        if self._min_size is not None and size < self._min_size:
+            return False
+        if self._max_size is not None and size > self._max_size:
+            return False
+        if self._after is not None and mtime < self._after:
+            return False
+        if self._before is not None and mtime > self._before:
+            return False
+        return True
+
+    def include_entry(self, entry: os.DirEntry) -> bool:
+        """return True if the os.scandir entry passes the filter, the
+        entry is only stat'd if the size or date is tested"""
+        if not self.include_name(name=entry.name, path=entry.path):
+            return False
+        if self.needs_stat:
+            try:
+                stats = entry.stat()
+            except OSError:
+                return False
+            return self.include_stat(size=stats.st_size, mtime=stats.st_mtime)
+        return True
+
+    def include_path(self, path: str) -> bool:
+        """return True if the file path passes the filter, as per
+        include_entry"""
+        if not self.include_name(name=os.path.basename(path), path=path):
+            return False
+        if self.needs_stat:
+            try:
+                stats = os.stat(path)
+            except OSError:
+                return False
+            return self.include_stat(size=stats.st_size, mtime=stats.st_mtime)
+        return True
+
+    def include_folder(self, path: str) -> bool:
+        """return True if the folder is to be walked"""
+        if self._prune and self._prune.match(os.path.basename(path)):
+            return False
+        if self._prune_paths and self._prune_paths.match(path):
+            return False
+        return True
+
+    def include(self, file_dict: dict) -> bool:
+        """return True if the file details pass the filter, the size and
+        date are taken from the details, or stat'd if missing or formatted"""
+        path = file_dict.get("path", "")
+        if not self.include_name(name=os.path.basename(path), path=path):
+            return False
+        if not self.needs_stat:
+            return True
+
+        size = file_dict.get("size")
+        mtime = file_dict.get("modified")
+        if size is None or not isinstance(mtime, (int, float)):
+            try:
+                stats = os.stat(path)
+            except OSError:
+                return False
+            size, mtime = stats.st_size, stats.st_mtime
+        return self.include_stat(size=size, mtime=mtime)
+
+def _get_set(values: list) -> set:
+    """return the lower case set of the extensions, or None if not set"""
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return {value.lower() for value in values}
+
+def _get_globs(globs: list) -> re.Pattern:
+    """return a single regex for the globs, or None if not set"""
+    if not globs:
+        return None
+    if isinstance(globs, str):
+        globs = [globs]
+    return re.compile("|".join(f"(?:{fnmatch.translate(glob)})" for glob in globs))
+
+def _get_time(value: object) -> float:
+    """return the epoch seconds for the date"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return time.mktime(time.strptime(value, DATE_FORMAT))
@@ -0,0 +1,95 @@
+"""This module provides the group index for the catalog, the parsed files
+are held in buckets keyed on the tuple of the grouping values, with the
+count for each node of the grouping tree, and the tree built on demand
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import logging
+
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# the value used for a missing or empty grouping value
+MISSING_GROUP = "<missing>"
+
+class GroupIndex():
+    """The files grouped by the grouping values of the parsers, e.g.
+    Modality -> BodyPart -> Study -> Series, the files are added to the
+    bucket for the tuple of the values, and the node counts are kept
+        index.add(grouping={"modality": "CT", "body": "HEAD"}, file_obj=...)
+        index.count("CT")               the files in and below the node
+        index.files("CT", "HEAD")       the files at the node
+        index.children("CT")            the values below the node
+        index.to_tree()                 the nested dict view, as
+            {"CT": {"HEAD": {"files": [...]}}}
+    the tree is built when asked for, and kept until a file is added"""
+    def __init__(self) -> None:
+        self._leaves = {}
+        self._counts = Counter()
+        self._children = {}
+        self._tree = None
+
+    def __len__(self) -> int:
+        return self._counts[()]
+
+    def __contains__(self, key: object) -> bool:
+        return self.to_tree().__contains__(key)
+
+    def __getitem__(self, key: str) -> object:
+        return self.to_tree()[key]
+
+    def __iter__(self):
+        return iter(self.to_tree())
+
+    def get(self, key: str, default: object = None) -> object:
+        """return the node of the tree view, as per dict.get"""
+        return self.to_tree().get(key, default)
+
+    def add(self, grouping: dict, file_obj: dict) -> None:
+        """Will add the file to the bucket for the grouping values"""
+        key = tuple(gv if gv else MISSING_GROUP for gv in grouping.values())
+        bucket = self._leaves.get(key)
+        if bucket is None:
+            bucket = self._leaves[key] = []
+            for idx in range(len(key)):
+                self._children.setdefault(key[:idx], {})[key[idx]] = None
+
+        bucket.append(file_obj)
+        for idx in range(len(key) + 1):
+            self._counts[key[:idx]] += 1
+        self._tree = None
+
+    def clear(self) -> None:
+        """Will remove all the files"""
+        self.__init__()
+
+    def count(self, *path: str) -> int:
+        """return the count of the files at and below the node"""
+        return self._counts.get(tuple(path), 0)
+
+    def files(self, *path: str) -> list:
+        """return the files at the node"""
+        return self._leaves.get(tuple(path), [])
+
+    def children(self, *path: str) -> list:
+        """return the grouping values below the node"""
+        return list(self._children.get(tuple(path), {}))
+
+    def iter_leaves(self) -> tuple:
+        """yield the (<tuple of values>, [<file>, ...]) of the buckets"""
+        yield from self._leaves.items()
+
+    def to_tree(self) -> dict:
+        """return the nested dict view of the groups, the files are in
+        the "files" list of the node"""
+        if self._tree is None:
+            tree = {}
+            for key, bucket in self._leaves.items():
+                node = tree
+                for value in key:
+                    node = node.setdefault(value, {})
+                node["files"] = bucket
+            self._tree = tree
+
+        return self._tree
@@ -0,0 +1,168 @@
+"""This module provides the content hashing functions, the hashes are
+configurable, the files are read into a reused buffer and the hashing
+can be run in a pool of workers separate to the folder walk
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from lost_cat.utils.instrument_utils import get_instrument
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# the default hashes, as per make_hash, and the read buffer size
+HASH_ALGOS = ["md5", "sha1"]
+HASH_BUFFER = 1024 * 1024
+
+HASH_FUNCS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+    "blake2s": hashlib.blake2s,
+}
+
+# the fast non-crypto hashes, if the xxhash package is installed
+if xxhash:
+    HASH_FUNCS["xxh64"] = xxhash.xxh64
+    HASH_FUNCS["xxh3_64"] = xxhash.xxh3_64
+    HASH_FUNCS["xxh3_128"] = xxhash.xxh3_128
+
+_local = threading.local()
+
+class HashNotHandled(Exception):
+    """A simple exception to raise for an unknown hash"""
+    def __init__(self, label: str, message: str) -> None:
+        self.label = label
+        self.message = message
+        super().__init__()
+
+def get_hashers(algorithms: list = None) -> dict:
+    """return a dict of the new hash objects for the algorithms,
+    keyed on the upper case name, e.g. {"MD5": <md5>}"""
+    hashers = {}
+    for algo in algorithms or HASH_ALGOS:
+        func = HASH_FUNCS.get(algo.lower())
+        if not func:
+            raise HashNotHandled(label=algo, message="Hash algorithm not available!")
+        hashers[algo.upper()] = func()
+
+    return hashers
+
+def hash_stream(f_io: object, algorithms: list = None, buff_size: int = HASH_BUFFER,
+        max_bytes: int = None) -> dict:
+    """Will hash the stream for the algorithms and return a dict of the hashes
+    the stream is read into a buffer, reused per thread, and only the
+    first max_bytes are read if set"""
+    hashers = get_hashers(algorithms=algorithms).items()
+    buff = _get_buffer(size=buff_size)
+    view = memoryview(buff)
+
+    left = max_bytes
+    total = 0
+    while left is None or left > 0:
+        size = _read_into(f_io=f_io, view=view if left is None or left >= buff_size \
+                else view[:left])
+        if not size:
+            break
+
+        for _, hasher in hashers:
+            hasher.update(view[:size])
+        total += size
+
+        if left is not None:
+            left -= size
+
+    get_instrument().count("read", size=total)
+    return {k: v.hexdigest() for k, v in hashers}
+
+def hash_file(uri: str, algorithms: list = None, buff_size: int = HASH_BUFFER) -> dict:
+    """Will hash the file for the algorithms and return a dict of the hashes
+    keyed on the upper case name, as per make_hash"""
+    labels = [algo.upper() for algo in algorithms or HASH_ALGOS]
+    try:
+        if os.path.exists(uri):
+            logger.debug('%s', uri)
+            with open(uri, 'rb', buffering=0) as f_io:
+                return hash_stream(f_io=f_io, algorithms=algorithms, buff_size=buff_size)
+
+        return {label: 'Missing file' for label in labels}
+
+    except OSError as ex:
+        logger.error('ERROR: [%s]\n%s', uri, ex)
+
+    return {label: 'ERROR' for label in labels}
+
+def hash_file_dict(file_dict: dict, options: dict = None) -> dict:
+    """Will add the "hash" to the file dict, if it's within the
+    "maxhashsize" option, the hashes are set by the options
+        "hashalgos":    the list of hashes, default md5 and sha1
+        "hashbuffer":   the read buffer size, default 1 MiB
+    """
+    if not options:
+        options = {}
+
+    maxsize = options.get("maxhashsize", 0)
+    if maxsize == 0 or maxsize >= file_dict.get("size",0):
+        with get_instrument().stage("hash", size=file_dict.get("size") or 0):
+            file_dict["hash"] = hash_file(uri=file_dict.get("path"),
+                    algorithms=options.get("hashalgos"),
+                    buff_size=options.get("hashbuffer", HASH_BUFFER))
+
+    return file_dict
+
+def hash_files(files: object, options: dict = None) -> dict:
+    """Will hash the files in a pool of threads, sized by the "hashworkers"
+    option, the hashing releases the GIL so the reads and hashes overlap
+    the files are yielded in order, with a bounded number in flight"""
+    if not options:
+        options = {}
+
+    workers = options.get("hashworkers") or os.cpu_count() or 1
+    window = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for file_dict in files:
+            window.append((file_dict, pool.submit(contextvars.copy_context().run,
+                    hash_file_dict, file_dict, options)))
+            while len(window) > workers * 4:
+                yield _pop_window(window)
+
+        while window:
+            yield _pop_window(window)
+
+def _pop_window(window: deque) -> dict:
+    """return the oldest file, once it's hashed"""
+    file_dict, fut = window.popleft()
+    fut.result()
+    return file_dict
+
+def _read_into(f_io: object, view: memoryview) -> int:
+    """read into the buffer view, for the streams without readinto
+    the read is copied into the buffer"""
+    if hasattr(f_io, "readinto"):
+        return f_io.readinto(view)
+
+    data = f_io.read(len(view))
+    view[:len(data)] = data
+    return len(data)
+
+def _get_buffer(size: int) -> bytearray:
+    """return the read buffer for the thread"""
+    buff = getattr(_local, "buff", None)
+    if buff is None or len(buff) != size:
+        buff = bytearray(size)
+        _local.buff = buff
+    return buff
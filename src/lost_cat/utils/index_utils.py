@@ -0,0 +1,169 @@
+"""A module for the scan index, the index persists the files found on a
+prior scan so a re-scan only has to process the new and changed files
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import json
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# the options that change the file details, if these change
+# between runs the index is stale and will be cleared
+INDEX_OPTIONS = ["profile", "stats", "epoch", "splitextention",
+        "generatehash", "maxhashsize", "hashalgos", "filter", "nested", "nestedsize"]
+
+class ScanIndex():
+    """A sqlite backed index of the files from the previous scan, keyed
+    on the path with the size, mtime and inode used to detect the changes,
+    the file details (hash, profile, archive files...) are stored
+    so an unchanged file can be used without a re-scan
+        {
+            <path>: (size, mtime, inode, file_dict),
+            ...
+        }
+    """
+    def __init__(self, uri: str, options: dict = None) -> None:
+        """Open, or create, the index file"""
+        self._uri = uri
+        self._conn = sqlite3.connect(uri)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                folder TEXT,
+                size INTEGER,
+                mtime INTEGER,
+                inode INTEGER,
+                data TEXT)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_folder ON files (folder)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # clear the index if the options have changed
+        opt_sig = json.dumps({k: (options or {}).get(k) for k in INDEX_OPTIONS},
+                sort_keys=True, default=str)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'options'").fetchone()
+        if row and row[0] != opt_sig:
+            logger.info("Index %s options changed, clearing", uri)
+            self._conn.execute("DELETE FROM files")
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('options', ?)", (opt_sig,))
+        self._conn.commit()
+
+        self._folder = None
+        self._rows = {}
+        self._changes = []
+        self._visited = set()
+        self._deleted = []
+        self._modified = set()
+        self._counts = {
+            "added": 0,
+            "modified": 0,
+            "deleted": 0,
+            "unchanged": 0
+        }
+
+    def __str__(self):
+        return f"ScanIndex <{self._uri}>"
+
+    def get_counts(self) -> dict:
+        """return the added, modified, deleted and unchanged counts"""
+        return dict(self._counts)
+
+    def get_deleted(self) -> list:
+        """return the file details of the deleted files"""
+        return self._deleted
+
+    def is_modified(self, path: str) -> bool:
+        """return True if the file was in the index and has changed"""
+        return path in self._modified
+
+    def open_folder(self, uri: str) -> None:
+        """Will load the indexed files for the folder, the files not
+        seen before the next folder is opened are deleted"""
+        self._close_folder()
+
+        self._folder = uri
+        self._visited.add(uri)
+        self._rows = {}
+        for row in self._conn.execute(
+                "SELECT path, size, mtime, inode, data FROM files WHERE folder = ?", (uri,)):
+            self._rows[row[0]] = row
+
+    def fetch(self, entry: os.DirEntry) -> dict:
+        """return the indexed file details if the file is unchanged,
+        otherwise None and the file should be scanned and updated"""
+        row = self._rows.get(entry.path)
+        if not row:
+            return None
+
+        file_stats = entry.stat()
+        if row[1] == file_stats.st_size and row[2] == file_stats.st_mtime_ns \
+                and row[3] == entry.inode():
+            self._rows.pop(entry.path)
+            self._counts["unchanged"] += 1
+            return json.loads(row[4])
+
+        return None
+
+    def update(self, entry: os.DirEntry, file_dict: dict) -> None:
+        """Will add the scanned file details to the index"""
+        if self._rows.pop(entry.path, None):
+            self._counts["modified"] += 1
+            self._modified.add(entry.path)
+        else:
+            self._counts["added"] += 1
+
+        file_stats = entry.stat()
+        self._changes.append((entry.path, self._folder, file_stats.st_size,
+                file_stats.st_mtime_ns, entry.inode(), json.dumps(file_dict)))
+
+    def commit(self, uri: str = None) -> None:
+        """Will save the changes, the folders under the scanned uri that
+        were not visited are removed from the index"""
+        self._close_folder()
+
+        if uri:
+            folders = [row[0] for row in self._conn.execute("SELECT DISTINCT folder FROM files")]
+            for folder in folders:
+                if folder in self._visited:
+                    continue
+                if folder != uri and not folder.startswith(os.path.join(uri, "")):
+                    continue
+
+                rows = self._conn.execute(
+                        "SELECT path, size, mtime, inode, data FROM files WHERE folder = ?",
+                        (folder,)).fetchall()
+                self._delete_rows(rows)
+
+        self._conn.commit()
+        self._visited = set()
+
+    def close(self) -> None:
+        """Will save the changes and close the index file"""
+        self.commit()
+        self._conn.close()
+
+    def _close_folder(self) -> None:
+        """Will write the changes for the open folder and remove
+        the files that were not seen"""
+        if self._folder is None:
+            return
+
+        self._delete_rows(self._rows.values())
+        self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                self._changes)
+
+        self._folder = None
+        self._rows = {}
+        self._changes = []
+
+    def _delete_rows(self, rows: list) -> None:
+        """remove the rows and track the deleted file details"""
+        paths = []
+        for row in rows:
+            paths.append((row[0],))
+            self._deleted.append(json.loads(row[4]))
+
+        if paths:
+            self._counts["deleted"] += len(paths)
+            self._conn.executemany("DELETE FROM files WHERE path = ?", paths)
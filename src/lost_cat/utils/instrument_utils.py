@@ -0,0 +1,288 @@
+"""This module provides the run instrumentation, the hot paths time their
+stage in the current instrument, which is a no-op unless the "instrument"
+option is set, the stats are sent to the sinks at the end of a run
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# the timings kept for each stage for the percentiles
+STAGE_SAMPLES = 10000
+
+class _NullStage():
+    """a stage that does nothing, for the null instrument"""
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+_NULL_STAGE = _NullStage()
+
+class NullInstrument():
+    """The instrument used when the instrumentation is off, the calls
+    are no-ops"""
+    enabled = False
+
+    def stage(self, name: str, size: int = 0) -> _NullStage:
+        return _NULL_STAGE
+
+    def count(self, name: str, value: int = 1, size: int = 0) -> None:
+        pass
+
+    def run(self, name: str) -> _NullStage:
+        return _NULL_STAGE
+
+    def get_stats(self) -> dict:
+        return {}
+
+class _Stage():
+    """a timed stage of the instrument"""
+    __slots__ = ("_instrument", "_name", "_size", "_start")
+
+    def __init__(self, instrument: "Instrument", name: str, size: int) -> None:
+        self._instrument = instrument
+        self._name = name
+        self._size = size
+        self._start = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._instrument.record(name=self._name, seconds=time.perf_counter() - self._start,
+                size=self._size)
+
+class Instrument():
+    """The per-stage counters, timings and bytes read of a run
+        with instrument.stage("hash", size=file_size):
+            ...
+        instrument.count("skipped")
+    the stats are:
+        {
+            <stage>: {"count": int, "total": float, "mean": float,
+                "p50": float, "p90": float, "p99": float, "max": float,
+                "bytes": int},
+            ...
+            "runs": {<run>: {"seconds": float, "peak": int, "profile": str}}
+        }
+    the percentiles are from a sample of the timings, sized by samples
+    the sinks are called with the stats at the end of each run
+    cprofile and trace_malloc will profile the runs, the profile is
+    saved to cprofile if it's a file path, else the top of it is added
+    to the run stats"""
+    enabled = True
+
+    def __init__(self, sinks: list = None, samples: int = STAGE_SAMPLES,
+            cprofile: object = None, trace_malloc: bool = False) -> None:
+        self._sinks = sinks or []
+        self._samples = samples
+        self._cprofile = cprofile
+        self._trace_malloc = trace_malloc
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._runs = {}
+
+    def stage(self, name: str, size: int = 0) -> _Stage:
+        """return a context to time the stage"""
+        return _Stage(instrument=self, name=name, size=size)
+
+    def count(self, name: str, value: int = 1, size: int = 0) -> None:
+        """Will add to the count, and bytes, of the stage without a timing"""
+        with self._lock:
+            stage = self._get_stage(name=name)
+            stage["count"] += value
+            stage["bytes"] += size
+
+    def record(self, name: str, seconds: float, size: int = 0) -> None:
+        """Will add the timing, and bytes, to the stage"""
+        with self._lock:
+            stage = self._get_stage(name=name)
+            stage["count"] += 1
+            stage["total"] += seconds
+            stage["bytes"] += size
+            if seconds > stage["max"]:
+                stage["max"] = seconds
+
+            # keep a uniform sample of the timings
+            timings = stage["timings"]
+            if len(timings) < self._samples:
+                timings.append(seconds)
+            else:
+                idx = random.randrange(stage["count"])
+                if idx < self._samples:
+                    timings[idx] = seconds
+
+    def run(self, name: str) -> "_Run":
+        """return a context for a run, the instrument is made current
+        for the run and the stats are sent to the sinks at the end"""
+        return _Run(instrument=self, name=name)
+
+    def get_stats(self) -> dict:
+        """return the stats of the stages and runs"""
+        with self._lock:
+            stats = {name: _summarize(stage) for name, stage in self._stages.items()}
+            stats["runs"] = {name: dict(run) for name, run in self._runs.items()}
+        return stats
+
+    def reset(self) -> None:
+        """Will clear the stats"""
+        with self._lock:
+            self._stages = {}
+            self._runs = {}
+
+    def _get_stage(self, name: str) -> dict:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {"count": 0, "total": 0.0, "max": 0.0,
+                    "bytes": 0, "timings": []}
+        return stage
+
+class _Run():
+    """the context of an instrumented run"""
+    def __init__(self, instrument: Instrument, name: str) -> None:
+        self._instrument = instrument
+        self._name = name
+        self._token = None
+        self._profiler = None
+        self._tracing = False
+        self._start = 0.0
+
+    def __enter__(self) -> "_Run":
+        self._token = _current.set(self._instrument)
+
+        if self._instrument._cprofile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if self._instrument._trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        run = {"seconds": time.perf_counter() - self._start}
+        if self._tracing:
+            run["peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        if self._profiler:
+            self._profiler.disable()
+            cprofile = self._instrument._cprofile
+            if isinstance(cprofile, str):
+                self._profiler.dump_stats(cprofile)
+            else:
+                s_io = io.StringIO()
+                pstats.Stats(self._profiler, stream=s_io).sort_stats("cumulative").print_stats(20)
+                run["profile"] = s_io.getvalue()
+
+        _current.reset(self._token)
+        with self._instrument._lock:
+            self._instrument._runs[self._name] = run
+
+        stats = self._instrument.get_stats()
+        for sink in self._instrument._sinks:
+            try:
+                sink(self._name, stats)
+            except Exception as ex:
+                logger.error("ERROR: instrument sink [%s]\n%s", sink, ex)
+
+def log_sink(level: int = logging.INFO) -> object:
+    """return a sink that logs the stats"""
+    def sink(name: str, stats: dict) -> None:
+        for stage, values in stats.items():
+            if stage == "runs":
+                continue
+            logger.log(level, "%s %s: count %s total %.3fs p50 %.6fs p99 %.6fs bytes %s",
+                    name, stage, values.get("count"), values.get("total"),
+                    values.get("p50"), values.get("p99"), values.get("bytes"))
+        logger.log(level, "%s: %.3fs", name, stats.get("runs", {}).get(name, {}).get("seconds"))
+    return sink
+
+def json_sink(uri: str) -> object:
+    """return a sink that writes the stats to a json file"""
+    def sink(name: str, stats: dict) -> None:
+        with open(uri, "w", encoding="utf-8") as f_io:
+            json.dump({"run": name, "stats": stats}, f_io, indent=2)
+    return sink
+
+def build_instrument(options: dict = None) -> object:
+    """return the instrument for the "instrument" option
+        True:       the stats are logged
+        <Instrument>
+        {
+            "log":          True, or the log level
+            "json":         the path of the json file for the stats
+            "callback":     a func(<run name>, <stats>)
+            "samples":      the timings kept per stage, default 10000
+            "cprofile":     True, or the path to save the profile to
+            "tracemalloc":  True to add the peak memory of the run
+        }
+    the NullInstrument is returned if not set"""
+    config = (options or {}).get("instrument")
+    if not config:
+        return NullInstrument()
+    if isinstance(config, Instrument):
+        return config
+    if not isinstance(config, dict):
+        config = {"log": True}
+
+    sinks = []
+    if config.get("log"):
+        level = config.get("log")
+        sinks.append(log_sink(level=logging.INFO if level is True else level))
+    if config.get("json"):
+        sinks.append(json_sink(uri=config.get("json")))
+    if config.get("callback"):
+        sinks.append(config.get("callback"))
+
+    return Instrument(sinks=sinks, samples=config.get("samples", STAGE_SAMPLES),
+            cprofile=config.get("cprofile"), trace_malloc=config.get("tracemalloc", False))
+
+def get_instrument() -> object:
+    """return the instrument of the current run, the instrument is held
+    in a context variable, so the pools copy the context to the workers"""
+    return _current.get()
+
+def instrumented(name: str) -> object:
+    """a decorator for the LostCat methods, the method is run as an
+    instrumented run of the instance instrument"""
+    def decorator(func: object) -> object:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self._instrument.run(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _summarize(stage: dict) -> dict:
+    """return the stats of the stage"""
+    timings = sorted(stage.get("timings"))
+    count = stage.get("count")
+    summary = {
+        "count": count,
+        "total": stage.get("total"),
+        "mean": stage.get("total") / count if count else 0.0,
+        "max": stage.get("max"),
+        "bytes": stage.get("bytes"),
+    }
+    for label, pct in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]:
+        summary[label] = timings[min(int(pct * len(timings)), len(timings) - 1)] if timings else 0.0
+    return summary
+
+# the instrument of the current run
+_current = contextvars.ContextVar("instrument", default=NullInstrument())
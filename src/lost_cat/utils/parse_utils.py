@@ -0,0 +1,289 @@
+"""This module provides the parser runs for process_artifacts, the files
+are parsed in work units, a chunk of the files or an archive with its
+members, so the units can be run in order, or in a pool of processes
+with each archive opened by the one worker
+a parser is either:
+    one-shot:   cls(uri=...) or cls(bytes_io=...), the set_* tags are
+                applied, then get_metadata() and close(), per file
+    lifecycle:  the class has a parse method, an instance is made with no
+                arguments and the set_* tags applied once per worker, then
+                parse(uri=...) or parse(bytes_io=...) returns the metadata
+                of each file, close() is called when the run ends, or as
+                the worker process exits
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import contextvars
+import functools
+import logging
+import os
+import threading
+
+from multiprocessing.util import Finalize
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from lost_cat.utils.instrument_utils import get_instrument
+from lost_cat.utils.path_utils import ARCHIVE_SEP, SPOOL_SIZE, ArchivePool
+from lost_cat.utils.path_utils import func_switch_zip, get_archive_ext, spool_file
+
+logger = logging.getLogger(__name__)
+
+# the parse context of the pool worker, set by the initializer
+_context = None
+
+# the configured lifecycle parsers of the thread, for the current context
+_local = threading.local()
+
+def build_units(files: dict, parse_ext: dict, options: dict = None, data: dict = None,
+        skip: set = None) -> tuple:
+    """Will group the files to be parsed into the work units, the files are
+    in chunks of the "parsechunk" option, default 64, and the archive
+    members by the top archive, then by the archive or nested archive
+    yields the units as the files are read, so a store is streamed, only
+    the keys of the archive members are held until the files are done
+        ("files", [(<key>, <file>), ...])
+        ("archive", <top archive>, [(<archive>, [(<key>, <file>), ...]), ...])
+    the count of the files by ext is added to data, if passed, as the
+    files are read, the keys in skip are not counted or parsed"""
+    if not options:
+        options = {}
+    if data is None:
+        data = {}
+
+    chunk_size = options.get("parsechunk") or 64
+    chunk = []
+    archives = {}
+    for f_key, file_obj in files.items():
+        if skip and f_key in skip:
+            continue
+
+        f_ext = file_obj.get("ext","<>")
+        if f_ext not in data:
+            data[f_ext] = 0
+        data[f_ext] += 1
+
+        if not parse_ext.get(f_ext):
+            continue
+
+        # defer the archive members to be grouped by archive,
+        # the nested members by the nested archive
+        if "zipfile" in file_obj:
+            z_top = file_obj.get("zipfile")
+            z_path = z_top
+            if ARCHIVE_SEP in file_obj.get("path"):
+                z_path = "{}{}{}".format(z_path, ARCHIVE_SEP,
+                        file_obj.get("path").rsplit(ARCHIVE_SEP, 1)[0])
+            archives.setdefault(z_top, {}).setdefault(z_path, []).append(f_key)
+            continue
+
+        chunk.append((f_key, _get_item(file_obj=file_obj)))
+        if len(chunk) >= chunk_size:
+            yield ("files", chunk)
+            chunk = []
+
+    if chunk:
+        yield ("files", chunk)
+
+    while archives:
+        z_top, z_groups = archives.popitem()
+        yield ("archive", z_top, [(z_path, [(f_key, _get_item(file_obj=files[f_key]))
+                for f_key in keys]) for z_path, keys in z_groups.items()])
+
+def count_parse_files(files: dict, parse_ext: dict, skip: set = None) -> int:
+    """return the count of the files to be parsed, the files are read
+    and not held, the keys in skip are not counted"""
+    return sum(1 for f_key, file_obj in files.items()
+            if parse_ext.get(file_obj.get("ext","<>")) and not (skip and f_key in skip))
+
+def _get_item(file_obj: dict) -> dict:
+    """return the file details for the unit, only the keys used to parse
+    are passed to the unit"""
+    return {k: file_obj.get(k) for k in ("path", "zipfile", "ext") if file_obj.get(k) is not None}
+
+def run_units(units: list, context: dict) -> tuple:
+    """Will run the work units and yield the (<key>, [<md_obj>, ...]) in
+    order, the units are run in a pool of processes if the "parseworkers"
+    option is set, with a bounded number of units in flight
+    the context is:
+        {
+            "parsers": {<ext>: [(<label>, <class>), ...]},
+            "tags": {"anonimizer": dict, "export": dict, "group": dict, "alias": dict},
+            "options": dict
+        }
+    """
+    workers = context.get("options", {}).get("parseworkers")
+    if not workers:
+        try:
+            for unit in units:
+                yield from run_unit(unit=unit, context=context)
+        finally:
+            close_parsers()
+        return
+
+    window = deque()
+    pool, workers, func = build_pool(context=context)
+    with pool:
+        for unit in units:
+            window.append(pool.submit(func, unit))
+            while len(window) > workers * 4:
+                yield from window.popleft().result()
+
+        while window:
+            yield from window.popleft().result()
+
+def build_pool(context: dict) -> tuple:
+    """return an executor to run the work units, the number of workers and
+    the function to run a unit, a pool of processes if the "parseworkers"
+    option is set, else a single thread"""
+    workers = context.get("options", {}).get("parseworkers")
+    if workers:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                initargs=(context,)), workers, _run_worker
+
+    # the thread runs in a copy of the context, for the current instrument
+    return ThreadPoolExecutor(max_workers=1), 1, functools.partial(
+            contextvars.copy_context().run, run_unit, context=context)
+
+def run_unit(unit: tuple, context: dict) -> list:
+    """return the parser results for the files in the work unit,
+    as [(<key>, [<md_obj>, ...]), ...]"""
+    if unit[0] == "files":
+        return [(f_key, run_parsers(file_obj=file_obj, context=context))
+                for f_key, file_obj in unit[1]]
+
+    # the archive, and the nested archives, are opened once in the pool
+    options = context.get("options", {})
+    results = []
+    with ArchivePool(size=options.get("archivepool", 4),
+            spool_size=options.get("spoolsize", SPOOL_SIZE)) as pool:
+        for z_path, items in unit[2]:
+            s_func = None
+            if options.get("tarstream", True) and ARCHIVE_SEP not in z_path:
+                s_func = func_switch_zip(ext=get_archive_ext(z_path), op_label="stream")
+
+            if s_func:
+                results.extend(_parse_stream(items=items, context=context,
+                        z_files=s_func(uri=z_path, names={f.get("path") for _, f in items})))
+                continue
+
+            for f_key, file_obj in items:
+                results.append((f_key, run_parsers(file_obj=file_obj, context=context,
+                        pool=pool)))
+
+    return results
+
+def run_parsers(file_obj: dict, context: dict, pool: ArchivePool = None,
+        bytes_io: object = None) -> list:
+    """Will run the parsers for the file and return the metadata of each,
+    the archive members are read from the archive held in the pool, or
+    from the passed bytes_io, which is rewound for each parser"""
+    options = context.get("options", {})
+    tags = context.get("tags", {})
+    md_objs = []
+
+    # scan using the template function
+    for p_idx, (p_label, cls) in enumerate(context.get("parsers", {}).get(
+            file_obj.get("ext","<>"), [])):
+        lifecycle = callable(getattr(cls, "parse", None))
+
+        # the fetched member stream is closed after the parser
+        f_io = None
+        if bytes_io:
+            if p_idx:
+                bytes_io.seek(0)
+            source = {"bytes_io": bytes_io}
+        elif "zipfile" in file_obj:
+            f_io = pool.fetch(uri=file_obj.get("zipfile"), item_path=file_obj.get("path"),
+                    seekable=getattr(cls, "random_access", False),
+                    max_size=options.get("spoolsize", SPOOL_SIZE))
+            if not f_io:
+                continue
+            source = {"bytes_io": f_io}
+        else:
+            source = {"uri": file_obj.get("path")}
+
+        logger.debug("Running Class %s -> %s", p_label, cls)
+
+        with get_instrument().stage(f"parse:{p_label}"):
+            if lifecycle:
+                md_objs.append(get_parser(p_label=p_label, cls=cls,
+                        context=context).parse(**source))
+            else:
+                obj = cls(**source)
+                _configure(obj=obj, tags=tags)
+                md_objs.append(obj.get_metadata())
+
+                # close th file
+                obj.close()
+
+        if f_io:
+            f_io.close()
+
+    return md_objs
+
+def get_parser(p_label: str, cls: object, context: dict) -> object:
+    """return the configured instance of the lifecycle parser for the
+    thread, an instance is made and the tags set once for each context,
+    so each run has its own instances, closed by close_parsers"""
+    if getattr(_local, "context", None) is not context:
+        close_parsers()
+        _local.context = context
+        _local.parsers = {}
+
+    obj = _local.parsers.get(p_label)
+    if obj is None:
+        obj = cls()
+        _configure(obj=obj, tags=context.get("tags", {}))
+        _local.parsers[p_label] = obj
+
+    return obj
+
+def close_parsers() -> None:
+    """Will close the lifecycle parsers of the thread"""
+    for obj in getattr(_local, "parsers", {}).values():
+        obj.close()
+    _local.context = None
+    _local.parsers = {}
+
+def _configure(obj: object, tags: dict) -> None:
+    """Will apply the tags to the parser"""
+    # load the anonimizer
+    obj.set_anonimizer(anonimizer=tags.get("anonimizer"))
+    obj.set_export_tags(tags=tags.get("export"))
+    obj.set_group_tags(tags=tags.get("group"))
+    obj.set_alias_tags(tags=tags.get("alias"))
+
+def _parse_stream(items: list, context: dict, z_files: object) -> list:
+    """return the parser results for the archive members as they're read
+    from the archive stream, the member is copied to a seekable temp file
+    if there is more than one parser or the parser needs random access"""
+    keys = {}
+    for f_key, file_obj in items:
+        keys[file_obj.get("path")] = (f_key, file_obj)
+
+    results = []
+    spool_size = context.get("options", {}).get("spoolsize", SPOOL_SIZE)
+    for member, f_io in z_files:
+        f_key, file_obj = keys.get(member.name)
+        classes = [cls for _, cls in context.get("parsers", {}).get(file_obj.get("ext","<>"), [])]
+        if len(classes) > 1 or any(getattr(cls, "random_access", False) for cls in classes):
+            f_io = spool_file(f_io=f_io, max_size=spool_size)
+
+        results.append((f_key, run_parsers(file_obj=file_obj, context=context, bytes_io=f_io)))
+        f_io.close()
+
+    return results
+
+def _init_worker(context: dict) -> None:
+    """set the parse context for the pool worker, the lifecycle parsers
+    are closed as the worker exits"""
+    global _context
+    _context = context
+    Finalize(None, close_parsers, exitpriority=10)
+    logger.debug("Parse worker %s", os.getpid())
+
+def _run_worker(unit: tuple) -> list:
+    """run the work unit in the pool worker"""
+    return run_unit(unit=unit, context=_context)
@@ -3,22 +3,39 @@ file scanning and zip file handling.
 @author: Dreffed
 copyright adscens.io 2022 / thoughtswin systems 2022
 """
-import hashlib
-import io
+import contextvars
 import logging
-import re
 import os
+import shutil
 import tarfile
+import tempfile
 import time
 import zipfile
 
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from urllib.parse import urlparse
 from validators import url as val_url
 
+from lost_cat.utils.filter_utils import FileFilter, get_filter
+from lost_cat.utils.hash_utils import hash_file, hash_file_dict, hash_files
+from lost_cat.utils.instrument_utils import get_instrument
 from lost_cat.utils.phrase_utils import PhraseTool
 
 logger = logging.getLogger(__name__)
 
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# the size an archive member is held in memory for random
+# access before it's spilled to a temp file
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# the separator for the path of a file in a nested archive,
+# <archive member>!/<member>, and the default budget of the bytes
+# read from the nested archives of an archive, a zip bomb guard
+ARCHIVE_SEP = "!/"
+NESTED_SIZE = 1024 * 1024 * 1024
+
 class SourceDoesNotExist(Exception):
     """A class to raise the missing file"""
 
@@ -36,23 +53,131 @@ class SourceNotHandled(Exception):
         self.message = message
         super().__init__(*args)
 
+# the archive extensions, the multi part extensions are listed
+# first so they're matched before the single part
+ARCHIVE_EXTS = [".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".tbz2",
+        ".tbz", ".txz", ".tar", ".zip"]
+
 def func_switch_zip(ext: str, op_label: str) -> object:
     """A sweithc dict to enable the selection of the
-    function for the zip file handlers, hard coded :("""
+    function for the zip file handlers, hard coded :(
+    the ext is as returned by get_archive_ext, the "stream" op
+    is only set for the compressed tars"""
+    tar_funcs = {
+        "open": open_tar,
+        "scan": scan_tar,
+        "fetch": fetch_tar
+    }
+    tar_stream = dict(tar_funcs, stream=stream_tar)
     func = {
         ".zip": {
             "open": open_zip,
             "scan": scan_zip,
             "fetch": fetch_zip
         },
-        ".tar.gz": {
-            "open": open_tar,
-            "read": scan_tar,
-            "fetch": fetch_tar
-        }
+        ".tar": tar_funcs,
+        ".tar.gz": tar_stream,
+        ".tgz": tar_stream,
+        ".tar.bz2": tar_stream,
+        ".tbz2": tar_stream,
+        ".tbz": tar_stream,
+        ".tar.xz": tar_stream,
+        ".txz": tar_stream,
     }
     return func.get(ext,{}).get(op_label)
 
+def get_archive_ext(uri: str) -> str:
+    """return the archive extension for the file, handles the
+    multi part extensions (.tar.gz etc.), None if not an archive"""
+    filename = os.path.basename(uri).lower()
+    for ext in ARCHIVE_EXTS:
+        if filename.endswith(ext):
+            return ext
+    return None
+
+class ArchivePool():
+    """A bounded pool of the open archive files, the least recently used
+    archive is closed when the pool is full, so an archive is opened, and
+    it's file list read, once while it is in use
+    a nested archive is opened with the composite path, <archive>!/<member>,
+    and is copied to a temp file, held in memory up to the spool size"""
+    def __init__(self, size: int = 4, spool_size: int = SPOOL_SIZE) -> None:
+        self._size = max(size, 1)
+        self._spool_size = spool_size
+        self._handles = OrderedDict()
+        self._opened = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __str__(self):
+        return f"ArchivePool <{len(self._handles)}/{self._size}>"
+
+    def get(self, uri: str) -> object:
+        """return the open archive handle, opening the archive if needed"""
+        if uri in self._handles:
+            self._handles.move_to_end(uri)
+            return self._handles[uri][1]
+
+        ext = get_archive_ext(uri)
+        z_func = func_switch_zip(ext=ext, op_label="open")
+        if not z_func:
+            return None
+
+        logger.debug("open archive %s", uri)
+        spool = None
+        if ARCHIVE_SEP in uri:
+            parent, item_path = uri.rsplit(ARCHIVE_SEP, 1)
+            spool = self.fetch(uri=parent, item_path=item_path,
+                    seekable=True, max_size=self._spool_size)
+            if not spool:
+                return None
+
+        while len(self._handles) >= self._size:
+            _, handle = self._handles.popitem(last=False)
+            _close_handle(handle)
+
+        zip_obj = z_func(uri=spool or uri)
+        self._opened += 1
+        self._handles[uri] = (ext, zip_obj, spool)
+        return zip_obj
+
+    def fetch(self, uri: str, item_path: str, seekable: bool = False,
+            max_size: int = SPOOL_SIZE) -> object:
+        """return the file object for the item in the archive, the item
+        can be a composite path into the nested archives,
+        see fetch_zip for the seekable option"""
+        if ARCHIVE_SEP in item_path:
+            inner_path, item_path = item_path.rsplit(ARCHIVE_SEP, 1)
+            uri = f"{uri}{ARCHIVE_SEP}{inner_path}"
+
+        zip_obj = self.get(uri=uri)
+        if not zip_obj:
+            return None
+
+        ext = self._handles[uri][0]
+        return func_switch_zip(ext=ext, op_label="fetch")(file_obj=zip_obj,
+                item_path=item_path, seekable=seekable, max_size=max_size)
+
+    def get_opened(self) -> int:
+        """return the count of the archive opens"""
+        return self._opened
+
+    def close(self) -> None:
+        """Will close all the open archives"""
+        while self._handles:
+            _, handle = self._handles.popitem(last=False)
+            _close_handle(handle)
+
+def _close_handle(handle: tuple) -> None:
+    """close the archive handle, and the temp file for a nested archive"""
+    _, zip_obj, spool = handle
+    zip_obj.close()
+    if spool:
+        spool.close()
 
 def build_path(uri: str) -> dict:
     """Will take a path, and split into components
@@ -159,6 +284,7 @@ def get_file_metadata(uri: str, options: dict = None) -> dict:
                 "accessed"
                 "size"
                 "bytes": szie in mb, gb, etc.
+            "epoch": the dates are left as the raw epoch seconds
 
     """
     if not os.path.exists(uri):
@@ -171,6 +297,7 @@ def get_file_metadata(uri: str, options: dict = None) -> dict:
     f_type = os.path.isfile(uri)
     file_dict =  {
             "type":f_type,
+            "path": uri,
             "root": f"{drv}{os.sep}",
             "folder" : dirpath,
             "file" : filename,
@@ -178,8 +305,7 @@ def get_file_metadata(uri: str, options: dict = None) -> dict:
     }
 
     if options and options.get("profile"):
-        p_obj = PhraseTool(in_phrase=filename)
-        file_dict["profile"] = p_obj.get_metadata()
+        file_dict["profile"] = PhraseTool.profile(phrase=filename)
 
     if options and options.get("splitextention"):
         file_dict["file"] = fname
@@ -189,161 +315,486 @@ def get_file_metadata(uri: str, options: dict = None) -> dict:
         pass
 
     if options and options.get("stats"):
-        time_format = "%Y-%m-%d %H:%M:%S"
-        file_stats = os.stat(uri)
-        file_dict["accessed"] = time.strftime(time_format,time.localtime(file_stats.st_atime))
-        file_dict["modified"] = time.strftime(time_format,time.localtime(file_stats.st_mtime))
-        file_dict["created"] = time.strftime(time_format,time.localtime(file_stats.st_ctime))
-        file_dict["size"] = file_stats.st_size
-        file_dict["mode"] = file_stats.st_mode
+        set_file_stats(file_dict=file_dict, file_stats=os.stat(uri), options=options)
 
     return file_dict
 
-def make_hash(uri: str, buff_size: int = 65536) -> dict:
-    """ Will hash the files for both MD5 and SHA1 and return a dict of the hashes"""
-    hashes = {}
-    md5 = hashlib.md5()
-    sha1 = hashlib.sha1()
+def get_entry_metadata(entry: os.DirEntry, options: dict = None) -> dict:
+    """return dict of file metadata for a os.scandir entry, the same
+    as get_file_metadata, but the type is taken from the cached entry
+    and stat is called at most once, and only for the "stats" option"""
+    drv, path = os.path.splitdrive(entry.path)
+    fname, ext = os.path.splitext(entry.name)
+    file_dict =  {
+            "type": entry.is_file(),
+            "path": entry.path,
+            "root": f"{drv}{os.sep}",
+            "folder" : os.path.dirname(path),
+            "file" : entry.name,
+            "ext": ext.lower()
+    }
 
-    try:
-        if os.path.exists(uri):
-            logger.debug('%s', uri)
-            with open(uri, 'rb') as f_io:
-                while True:
-                    d_bytes = f_io.read(buff_size)
-                    if not d_bytes:
-                        break
-                    md5.update(d_bytes)
-                    sha1.update(d_bytes)
-
-            hashes['MD5'] = md5.hexdigest()
-            hashes['SHA1'] = sha1.hexdigest()
-        else:
-            hashes['MD5'] = 'Missing file'
-            hashes['SHA1'] = 'Missing file'
+    if options and options.get("profile"):
+        file_dict["profile"] = PhraseTool.profile(phrase=entry.name)
 
-    except OSError as ex:
-        logger.error('ERROR: [%s]\n%s', uri, ex)
+    if options and options.get("splitextention"):
+        file_dict["file"] = fname
+
+    if options and options.get("stats"):
+        set_file_stats(file_dict=file_dict, file_stats=entry.stat(), options=options)
 
-        hashes['MD5'] = 'ERROR'
-        hashes['SHA1'] = 'ERROR'
+    return file_dict
+
+def set_file_stats(file_dict: dict, file_stats: os.stat_result, options: dict = None) -> None:
+    """Will add the date and size details to the file dict, the dates are
+    formatted unless the "epoch" option is set"""
+    if options and options.get("epoch"):
+        file_dict["accessed"] = file_stats.st_atime
+        file_dict["modified"] = file_stats.st_mtime
+        file_dict["created"] = file_stats.st_ctime
+    else:
+        file_dict["accessed"] = time.strftime(TIME_FORMAT, time.localtime(file_stats.st_atime))
+        file_dict["modified"] = time.strftime(TIME_FORMAT, time.localtime(file_stats.st_mtime))
+        file_dict["created"] = time.strftime(TIME_FORMAT, time.localtime(file_stats.st_ctime))
+    file_dict["size"] = file_stats.st_size
+    file_dict["mode"] = file_stats.st_mode
 
-    return hashes
+def make_hash(uri: str, buff_size: int = 65536) -> dict:
+    """ Will hash the files for both MD5 and SHA1 and return a dict of the hashes
+    see hash_utils.hash_file for the other hashes"""
+    return hash_file(uri=uri, algorithms=["md5", "sha1"], buff_size=buff_size)
 
 def scan_files(uri: str, options: dict = None) -> dict:
     """Will scan the folder and walk the files and folders below
+    if the "hashworkers" option is set, the hashing is run in a
+    pool of threads, see hash_utils.hash_files
     yields the found file"""
-    for dirpath, _, filenames in os.walk(uri):
+    files = _walk_files(uri=uri, options=options)
+    if options and options.get("generatehash") and options.get("hashworkers"):
+        return hash_files(files=files, options=options)
+    return files
+
+def _walk_files(uri: str, options: dict = None) -> dict:
+    """Will walk the files with os.walk, for scan_files, the filter is
+    applied to the names before the metadata, and the pruned folders
+    are not walked"""
+    file_filter = get_filter(options=options)
+    instrument = get_instrument()
+    walker = _timed_walk(uri=uri, instrument=instrument) if instrument.enabled else os.walk(uri)
+    for dirpath, dirnames, filenames in walker:
+        if file_filter and file_filter.prunes:
+            dirnames[:] = [d for d in dirnames
+                    if file_filter.include_folder(path=os.path.join(dirpath, d))]
+
         for fullname in filenames:
             filepath = os.path.join(dirpath,fullname)
-            file_dict = get_file_metadata(uri=filepath, options=options)
-            ext = file_dict.get("ext","")
-
-            # filter the files...
-            if not is_include(file_dict=file_dict, options=options):
+            if file_filter and not file_filter.include_path(path=filepath):
                 continue
 
-            # handel the options for hash
-            if options and options.get("generatehash"):
-                maxsize = options.get("maxhashsize", 0)
-                if maxsize == 0 or maxsize >= file_dict.get("size",0):
-                    file_dict["hash"] = make_hash(uri=filepath)
+            with instrument.stage("metadata"):
+                file_dict = get_file_metadata(uri=filepath, options=options)
+            _scan_file(file_dict=file_dict, options=options)
+            yield file_dict
+
+def _timed_walk(uri: str, instrument: object) -> tuple:
+    """yield the os.walk of the folder, with each folder listing timed"""
+    walker = os.walk(uri)
+    while True:
+        start = time.perf_counter()
+        step = next(walker, None)
+        if step is None:
+            return
+        instrument.record(name="list", seconds=time.perf_counter() - start)
+        yield step
+
+def scan_entries(uri: str, options: dict = None, index: object = None,
+        checkpoint: object = None) -> dict:
+    """Will scan the folder and walk the files and folders below using
+    os.scandir, the file type and size come from the cached entry so
+    there is at most one stat per file, the walk order is as per os.walk
+    if a ScanIndex is passed the unchanged files are taken from the index
+    and only the new and changed files are scanned
+    if a Checkpoint is passed the walk starts from the checkpoint frontier,
+    the found files and finished folders are added to the checkpoint, and
+    the files found before the checkpoint are not yielded
+    the "hashworkers" option is as per scan_files, but is not used with
+    the index or checkpoint, as they need the hash when the file is added
+    yields the found file"""
+    if (index or checkpoint) and options and options.get("hashworkers"):
+        options = dict(options, hashworkers=0)
 
-            op_func = func_switch_zip(ext, "scan")
-            if op_func:
-                zfiles = op_func(uri=filepath)
+    files = _walk_entries(uri=uri, options=options, index=index, checkpoint=checkpoint)
+    if options and options.get("generatehash") and options.get("hashworkers"):
+        return hash_files(files=files, options=options)
+    return files
 
-                file_dict["files"] = zfiles
-                yield file_dict
+def _walk_entries(uri: str, options: dict = None, index: object = None,
+        checkpoint: object = None) -> dict:
+    """Will walk the files with os.scandir, for scan_entries"""
+    file_filter = get_filter(options=options)
+    instrument = get_instrument()
+    folders = checkpoint.open_root(uri=uri) if checkpoint else [uri]
+
+    # a resumed walk does not visit the finished folders, so the
+    # index can't find the deleted files
+    resumed = folders != [uri]
+    while folders:
+        folder = folders.pop()
+        sub_folders, entries = _list_folder(uri=folder, file_filter=file_filter)
+        folders.extend(reversed(sub_folders))
+
+        if index:
+            index.open_folder(uri=folder)
+
+        for entry in entries:
+            if index:
+                file_dict = index.fetch(entry=entry)
+                if file_dict:
+                    if checkpoint:
+                        checkpoint.add_file(file_dict=file_dict)
+                    yield file_dict
+                    continue
+
+            with instrument.stage("metadata"):
+                file_dict = get_entry_metadata(entry=entry, options=options)
+            _scan_file(file_dict=file_dict, options=options)
+            if index:
+                index.update(entry=entry, file_dict=file_dict)
+            if checkpoint:
+                checkpoint.add_file(file_dict=file_dict)
+            yield file_dict
+
+        if checkpoint:
+            checkpoint.finish_folder(uri=folder, sub_folders=sub_folders)
+
+    if checkpoint:
+        checkpoint.finish_root(uri=uri)
+    if index:
+        index.commit(uri=None if resumed else uri)
+
+def count_files(uri: str, options: dict = None) -> int:
+    """return the count of the files below the folder, the folders are
+    listed with os.scandir and the filter is applied, but the files are
+    not read, for the eta of the progress events"""
+    file_filter = get_filter(options=options)
+    count = 0
+    folders = [uri]
+    while folders:
+        sub_folders, entries = _list_folder(uri=folders.pop(), file_filter=file_filter)
+        folders.extend(sub_folders)
+        count += len(entries)
+    return count
+
+def scan_files_parallel(uri: str, options: dict = None) -> dict:
+    """Will scan the folder and walk the files and folders below using
+    a pool of threads, each folder is listed and the files stat'd in a
+    thread, the cpu bound profile and hash work is handed to a pool of
+    processes.
+    yields the found file, as per scan_files, but in completion order
+        options:
+            "workers":      number of threads, default cpu count
+            "processes":    number of processes, 0 will run the profile and
+                            hash in the threads, default to workers
+            "chunksize":    number of files per process task, default 64
+    the "hashworkers" option is not used, the files are hashed in the
+    threads or processes of the walker
+    """
+    if not options:
+        options = {}
+
+    workers = options.get("workers") or os.cpu_count() or 1
+    processes = options.get("processes", workers)
+    chunk_size = options.get("chunksize") or 64
+
+    # the threads will do the io bound work, the cpu bound work
+    # is deferred to the process pool if it is in use
+    p_pool = None
+    t_options = options
+    if processes and (options.get("profile") or options.get("generatehash")):
+        t_options = dict(options, profile=False, generatehash=False)
+        p_pool = ProcessPoolExecutor(max_workers=processes)
+    elif options.get("hashworkers"):
+        t_options = dict(options, hashworkers=0)
+
+    t_pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        # the threads run in a copy of the context, for the current instrument
+        folders = {t_pool.submit(contextvars.copy_context().run, _scan_folder, uri, t_options)}
+        batches = set()
+        while folders or batches:
+            done, _ = wait(folders | batches, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in folders:
+                    folders.discard(fut)
+                    sub_folders, files = fut.result()
+                    for sub_folder in sub_folders:
+                        folders.add(t_pool.submit(contextvars.copy_context().run,
+                                _scan_folder, sub_folder, t_options))
+
+                    if p_pool:
+                        for idx in range(0, len(files), chunk_size):
+                            batches.add(p_pool.submit(_process_files,
+                                    files[idx:idx+chunk_size], options))
+                        continue
+                else:
+                    batches.discard(fut)
+                    files = fut.result()
+
+                for file_dict in files:
+                    yield file_dict
+    finally:
+        t_pool.shutdown(wait=True)
+        if p_pool:
+            p_pool.shutdown(wait=True)
+
+def _scan_folder(uri: str, options: dict = None) -> tuple:
+    """Will list a single folder, the folders are returned to be walked
+    and the files are returned with their metadata, used by the parallel
+    walker"""
+    folders, entries = _list_folder(uri=uri, file_filter=get_filter(options=options))
+
+    instrument = get_instrument()
+    files = []
+    for entry in entries:
+        with instrument.stage("metadata"):
+            file_dict = get_entry_metadata(entry=entry, options=options)
+        _scan_file(file_dict=file_dict, options=options)
+        files.append(file_dict)
+
+    return folders, files
+
+def _list_folder(uri: str, file_filter: FileFilter = None) -> tuple:
+    """Will list a single folder with os.scandir and return the folders and
+    the file entries, symlinked folders are not followed as per os.walk
+    the filter, if passed, is applied to the entries and the pruned
+    folders are dropped"""
+    folders = []
+    entries = []
+    try:
+        with get_instrument().stage("list"), os.scandir(uri) as it_entries:
+            for entry in it_entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if not is_dir:
+                    if not file_filter or file_filter.include_entry(entry=entry):
+                        entries.append(entry)
+                elif not entry.is_symlink():
+                    if not file_filter or file_filter.include_folder(path=entry.path):
+                        folders.append(entry.path)
 
-            else:
-                yield file_dict
+    except OSError as ex:
+        logger.error('ERROR: [%s]\n%s', uri, ex)
 
-def is_include(file_dict: dict, options: dict = None) -> bool:
-    """will use the filter conditions and if all filters are matched
-    will return true"""
-    if not options:
-        return True
+    return folders, entries
 
-    filter_config = options.get("filter")
-    if not filter_config:
-        return True
+def _scan_file(file_dict: dict, options: dict = None) -> None:
+    """Will apply the hash and archive scan options to the found file
+    details, the files are filtered by the walkers before this"""
+    uri = file_dict.get("path")
+
+    # handel the options for hash, unless it's run in the hash pool
+    if options and options.get("generatehash") and not options.get("hashworkers"):
+        hash_file_dict(file_dict=file_dict, options=options)
+
+    op_func = func_switch_zip(get_archive_ext(uri), "scan")
+    if op_func:
+        with get_instrument().stage("archive", size=file_dict.get("size", 0)):
+            file_dict["files"] = op_func(uri=uri, options=options)
+
+def _process_files(files: list, options: dict = None) -> list:
+    """Will run the cpu bound profile and hash work for a batch of
+    files, used in the process pool of the parallel walker"""
+    if options.get("profile"):
+        profiles = PhraseTool.profile_many(
+                os.path.basename(file_dict.get("path")) for file_dict in files)
+        for file_dict, profile in zip(files, profiles):
+            file_dict["profile"] = profile
+
+    for file_dict in files:
+        if options.get("generatehash"):
+            hash_file_dict(file_dict=file_dict, options=options)
 
-    output = {}
-    if "exts" in filter_config:
-        output["ext"] = 0
-        if file_dict.get("ext","") in filter_config.get("exts", []):
-            output["ext"] = 1
+    return files
 
-    if "regex" in filter_config:
-        output["regex"] = 0
-        filter_reg = re.compile(filter_config.get("regex", ""))
-        m_re = filter_reg.match(file_dict.get("name",""))
-        if m_re:
-            output["regex"] = 1
+def is_include(file_dict: dict, options: dict = None) -> bool:
+    """will use the filter conditions and if all filters are matched
+    will return true, see filter_utils.FileFilter for the conditions"""
+    file_filter = get_filter(options=options)
+    if not file_filter:
+        return True
 
-    return len(output) == sum(output.values)
+    return file_filter.include(file_dict=file_dict)
 
 def open_zip(uri: str) -> zipfile.ZipFile:
     """Will open a zip file and return the file handle"""
     return zipfile.ZipFile(uri)
 
 def open_tar(uri: str) -> tarfile.TarFile:
-    """Will open a tar file and return the handle"""
-    return tarfile.open(uri, mode="r")
-
-def scan_zip(uri: str) -> dict:
-    """Will scan the zip file and return the file details"""
-    zip_file = zipfile.ZipFile(uri)
+    """Will open a tar file, or file object, and return the handle"""
+    if isinstance(uri, str):
+        return tarfile.open(uri, mode="r")
+    return tarfile.open(fileobj=uri, mode="r")
+
+def scan_zip(uri: str, options: dict = None) -> dict:
+    """Will scan the zip file and return the file details, if the
+    "nested" option is set the archives in the zip are scanned to that
+    depth, see scan_nested"""
+    with zipfile.ZipFile(uri) as zip_file:
+        return _list_zip(zip_file=zip_file, uri=uri, prefix="", options=options,
+                budget=_get_budget(options=options))
+
+def scan_tar(uri: str, options: dict = None) -> dict:
+    """Will handle the targz file, as per scan_zip"""
+    with tarfile.open(uri, mode="r") as tar_file:
+        return _list_tar(tar_file=tar_file, uri=uri, prefix="", options=options,
+                budget=_get_budget(options=options))
+
+def scan_nested(f_io: object, ext: str, uri: str, prefix: str, options: dict = None,
+        depth: int = 1, budget: dict = None) -> list:
+    """Will scan an archive read from a stream, the archive is a member
+    of the archive at uri, and the prefix is the composite path to it
+    the scan descends into the archives found up to the "nested" option
+    depth, the declared size of each nested archive is taken from the
+    "nestedsize" byte budget, and it's skipped once the budget is spent
+    the zip is copied to a temp file, as it needs random access, held in
+    memory up to the "spoolsize" option, the tar is read as a stream"""
+    if ext == ".zip":
+        max_size = (options or {}).get("spoolsize", SPOOL_SIZE)
+        with spool_file(f_io=f_io, max_size=max_size) as spool, zipfile.ZipFile(spool) as zip_file:
+            return _list_zip(zip_file=zip_file, uri=uri, prefix=prefix,
+                    options=options, depth=depth, budget=budget)
+
+    with tarfile.open(fileobj=f_io, mode="r|*") as tar_file:
+        return _list_tar(tar_file=tar_file, uri=uri, prefix=prefix,
+                options=options, depth=depth, budget=budget)
+
+def _list_zip(zip_file: zipfile.ZipFile, uri: str, prefix: str, options: dict = None,
+        depth: int = 0, budget: dict = None) -> list:
+    """return the file details for the zip members, and the nested members"""
     files = []
-
     for szf in zip_file.infolist():
-        if not szf.is_dir():
-            filepath = szf.filename
-            dirpath, fullname = os.path.split(filepath)
-            filename, ext = os.path.splitext(fullname)
-            sub_file = {
-                "zipfile": uri,
-                "path": filepath,
-                "folder": dirpath,
-                "name": filename,
-                "size": szf.file_size,
-                "ext": ext.lower(),
-            }
-            files.append(sub_file)
+        if szf.is_dir():
+            continue
+
+        files.append(_member_dict(uri=uri, prefix=prefix, filepath=szf.filename,
+                size=szf.file_size, crc=szf.CRC))
+
+        ext = _get_nested_ext(filepath=szf.filename, size=szf.file_size,
+                options=options, depth=depth, budget=budget)
+        if ext:
+            with zip_file.open(szf) as f_io:
+                files.extend(scan_nested(f_io=f_io, ext=ext, uri=uri,
+                        prefix=f"{prefix}{szf.filename}{ARCHIVE_SEP}",
+                        options=options, depth=depth+1, budget=budget))
 
     return files
 
-def scan_tar(uri: str) -> dict:
-    """Will handle the targz file"""
-    tar_file = tarfile.open(uri, mode="r")
+def _list_tar(tar_file: tarfile.TarFile, uri: str, prefix: str, options: dict = None,
+        depth: int = 0, budget: dict = None) -> list:
+    """return the file details for the tar members, and the nested members
+    the tar can be a stream, so the members are read in order"""
     files = []
-    for szf in tar_file.getmembers():
+    for szf in tar_file:
         # process only files...
         if not szf.isfile():
             continue
 
-        filepath = szf.name
-        dirpath, fullname = os.path.split(filepath)
-        filename, ext = os.path.splitext(fullname)
-        sub_file = {
-            "zipfile": uri,
-            "path": filepath,
-            "folder": dirpath,
-            "name": filename,
-            "size": szf.size,
-            "ext": ext.lower(),
-        }
-        files.append(sub_file)
+        files.append(_member_dict(uri=uri, prefix=prefix, filepath=szf.name, size=szf.size))
+
+        ext = _get_nested_ext(filepath=szf.name, size=szf.size,
+                options=options, depth=depth, budget=budget)
+        if ext:
+            files.extend(scan_nested(f_io=tar_file.extractfile(szf), ext=ext, uri=uri,
+                    prefix=f"{prefix}{szf.name}{ARCHIVE_SEP}",
+                    options=options, depth=depth+1, budget=budget))
 
     return files
 
-def fetch_zip(file_obj: zipfile.ZipFile, item_path: str) -> object:
-    """for a given zip file, return the item"""
-    _data = file_obj.read(item_path)
-    return io.BytesIO(_data)
+def _member_dict(uri: str, prefix: str, filepath: str, size: int, crc: int = None) -> dict:
+    """return the file details for an archive member, the zip
+    members have the crc of the member"""
+    dirpath, fullname = os.path.split(filepath)
+    filename, ext = os.path.splitext(fullname)
+    sub_file = {
+        "zipfile": uri,
+        "path": f"{prefix}{filepath}",
+        "folder": dirpath,
+        "name": filename,
+        "size": size,
+        "ext": ext.lower(),
+    }
+    if crc is not None:
+        sub_file["crc"] = crc
+    return sub_file
+
+def _get_budget(options: dict = None) -> dict:
+    """return the byte budget for the nested archives"""
+    return {"size": (options or {}).get("nestedsize", NESTED_SIZE)}
+
+def _get_nested_ext(filepath: str, size: int, options: dict = None,
+        depth: int = 0, budget: dict = None) -> str:
+    """return the archive ext if the member is an archive to be scanned,
+    this takes the size of the archive from the budget"""
+    if not options or depth >= options.get("nested", 0):
+        return None
+
+    ext = get_archive_ext(filepath)
+    if not func_switch_zip(ext=ext, op_label="scan"):
+        return None
+
+    if size > budget.get("size", 0):
+        logger.warning("Nested archive %s skipped, the size budget is spent", filepath)
+        return None
+
+    budget["size"] -= size
+    return ext
+
+def get_artifact_key(file_dict: dict) -> str:
+    """return the catalog key for the file, the path for a file and
+    the <archive>!/<path> for an archive member"""
+    if "zipfile" in file_dict:
+        return f"{file_dict.get('zipfile')}{ARCHIVE_SEP}{file_dict.get('path')}"
+    return file_dict.get("path")
+
+def fetch_zip(file_obj: zipfile.ZipFile, item_path: str, seekable: bool = False,
+        max_size: int = SPOOL_SIZE) -> object:
+    """for a given zip file, return the item as a stream, if the reader
+    needs random access the item is copied to a temp file, held in memory
+    up to the max size"""
+    f_io = file_obj.open(item_path)
+    if seekable:
+        return spool_file(f_io=f_io, max_size=max_size)
+    return f_io
+
+def fetch_tar(file_obj: tarfile.TarFile, item_path: str, seekable: bool = False,
+        max_size: int = SPOOL_SIZE) -> object:
+    """For a given tarfile return the item as a stream, as per fetch_zip"""
+    f_io = file_obj.extractfile(item_path)
+    if f_io and seekable:
+        return spool_file(f_io=f_io, max_size=max_size)
+    return f_io
+
+def stream_tar(uri: str, names: set = None) -> tuple:
+    """Will read the tar in a single pass, as it's decompressed, and
+    yield the (member, file object) for the files, or only the named files
+    the file object must be read before the next member is fetched"""
+    with tarfile.open(uri, mode="r|*") as tar_file:
+        for member in tar_file:
+            if not member.isfile():
+                continue
+            if names is not None and member.name not in names:
+                continue
+
+            yield member, tar_file.extractfile(member)
 
-def fetch_tar(file_obj: tarfile.TarFile, item_path: str) -> object:
-    """For a given tarfile return the item"""
-    _data = file_obj.read(item_path)
-    return io.BytesIO(_data)
+def spool_file(f_io: object, max_size: int = SPOOL_SIZE) -> object:
+    """Will copy the stream to a seekable temp file, the file is held
+    in memory up to the max size and then spilled to disk"""
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    with f_io:
+        shutil.copyfileobj(f_io, spool)
+    spool.seek(0)
+    return spool
@@ -2,9 +2,80 @@
 
 import re
 import logging
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from lost_cat.utils.instrument_utils import get_instrument
 
 logger = logging.getLogger(__name__)
 
+# the default number of profiles held in the cache
+PROFILE_CACHE_SIZE = 65536
+
+class ProfileCache():
+    """A bounded least recently used cache of the phrase profiles, with
+    the hit and miss counts, the profiles are stored and returned as
+    shallow copies, so a change to a returned profile is not cached"""
+    def __init__(self, size: int = PROFILE_CACHE_SIZE) -> None:
+        self._size = size
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, phrase: str) -> dict:
+        """return a copy of the cached profile, or None"""
+        with self._lock:
+            profile = self._profiles.get(phrase)
+            if profile is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._profiles.move_to_end(phrase)
+            return dict(profile)
+
+    def add_hits(self, count: int = 1) -> None:
+        """add to the hits, for the repeats found outside the cache"""
+        with self._lock:
+            self.hits += count
+
+    def put(self, phrase: str, profile: dict) -> None:
+        """add a copy of the profile, the oldest is dropped if the cache is full"""
+        with self._lock:
+            self._profiles[phrase] = dict(profile)
+            self._profiles.move_to_end(phrase)
+            while len(self._profiles) > self._size:
+                self._profiles.popitem(last=False)
+
+    def set_size(self, size: int) -> None:
+        """set the cache size, the cache is trimmed to the size"""
+        with self._lock:
+            self._size = size
+            while len(self._profiles) > self._size:
+                self._profiles.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        """return the hits, misses and size of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._profiles),
+            "maxsize": self._size
+        }
+
+    def clear(self) -> None:
+        """empty the cache and reset the counts"""
+        with self._lock:
+            self._profiles.clear()
+            self.hits = 0
+            self.misses = 0
+
 class PhraseTool:
     """
     ---
@@ -16,19 +87,23 @@ class PhraseTool:
 
     """
 
-    # instatitate as a class variable
+    # instatitate as a class variable, the token types in order of
+    # precedence, the abbreviation stops short of a title case word
     _regexes = {
-        "tcase": re.compile("[A-Z][a-z]+"),
-        "abbrv": re.compile("[A-Z]{2,}"),
-        "ucase": re.compile("[A-Z]+"),
-        "lcase": re.compile("[a-z]+"),
-        "code": re.compile(r"[\u4e00-\u9fff]+"),
-        "decimal": re.compile(r"\d+\.\d+"),
-        "int": re.compile(r"\d+"),
-        "group": re.compile(r"[()\[\]{}']+"),
-        "formula": re.compile(r"[,!@#$%&+=?]+"),
-        "space": re.compile(r"[\. _\-\t]+")
+        "tcase": "[A-Z][a-z]+",
+        "abbrv": "[A-Z]{2,}(?![a-z])",
+        "ucase": "[A-Z]",
+        "lcase": "[a-z]+",
+        "code": r"[\u4e00-\u9fff]+",
+        "decimal": r"\d+\.\d+",
+        "int": r"\d+",
+        "group": r"[()\[\]{}']+",
+        "formula": r"[,!@#$%&+=?]+",
+        "space": r"[\. _\-\t]+"
     }
+    _tokenizer = re.compile("|".join(f"(?P<{k}>{v})" for k, v in _regexes.items()))
+    _letters = ("tcase", "abbrv", "ucase")
+    _cache = ProfileCache()
     name = "names"
     version = "0.0.1"
 
@@ -38,50 +113,120 @@ class PhraseTool:
     def __str__(self):
         return f"{self.name} {self.version} <{self._phrase}>"
 
+    @classmethod
+    def profile(cls, phrase: str) -> dict:
+        """return the metadata for the phrase, from the profile cache"""
+        profile = cls._cache.get(phrase)
+        if profile is None:
+            with get_instrument().stage("profile"):
+                profile = cls(in_phrase=phrase).get_metadata()
+            cls._cache.put(phrase, profile)
+        return profile
+
+    @classmethod
+    def profile_many(cls, phrases: object, processes: int = 0, chunksize: int = 256) -> list:
+        """return the metadata for each of the phrases, in order, the cached
+        profiles are reused and the repeats in the batch are profiled once
+        if processes is set, and there are more than chunksize phrases to
+        profile, the profiling is run in a pool of processes"""
+        phrases = list(phrases)
+        profiles = [None] * len(phrases)
+        missing = {}
+        for idx, phrase in enumerate(phrases):
+            if phrase in missing:
+                missing[phrase].append(idx)
+                cls._cache.add_hits()
+                continue
+
+            profile = cls._cache.get(phrase)
+            if profile is None:
+                missing[phrase] = [idx]
+            else:
+                profiles[idx] = profile
+
+        todo = list(missing)
+        if processes and len(todo) > chunksize:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(_get_metadata, todo, chunksize=chunksize))
+        else:
+            results = [cls(in_phrase=phrase).get_metadata() for phrase in todo]
+
+        for phrase, profile in zip(todo, results):
+            cls._cache.put(phrase, profile)
+            for idx in missing[phrase]:
+                profiles[idx] = dict(profile)
+
+        return profiles
+
+    @classmethod
+    def get_cache(cls) -> ProfileCache:
+        """return the profile cache, for the stats and size"""
+        return cls._cache
+
     def get_metadata(self) -> dict:
-        """This will return a profile of the file path and name
+        """This will return a profile of the file path and name, the phrase
+        is tokenized in a single pass, a lower case word runs on over the
+        letters that follow it, e.g. "fileName" is L8 T4, and the expand
+        is the phrase with the tokens replaced by the type letter
 
         Parameters
         ----------
 
         Returns
         -------
-        None
+        {
+            "parts": [{"start", "end", "type", "value"}, ...],
+            "short": the profile without the lengths, e.g. "TSI"
+            "profile": the type and length of each part, e.g. "T4SI3"
+            "expand": the phrase with the placeholders
+        }
         """
         in_phrase = self._phrase
-        positions = {}
-        p = {}
-        for k,v in self._regexes.items():
-            for m in v.finditer(in_phrase):
-                l = len(m.group())
-                s = m.start()
-                e = m.end()
-                if s not in p:
-                    p[s] = {
-                        "start": s,
-                        "end": e,
-                        "type": k,
-                        "value": m.group()
-                    }
-
-                    # remove the found groups with place holders
-                    in_phrase = "{}{}{}".format(in_phrase[:s], k[0]*l, in_phrase[e:])
-                    if l == 1:
-                        positions[s] = k[0]
-                    else:
-                        positions[s] = "{}{}".format(k[0],l)
+        parts = []
+        expand = []
+        lcase = None
+        pos = 0
+        for m in self._tokenizer.finditer(in_phrase):
+            k = m.lastgroup
+            s, e = m.span()
+            if s > pos:
+                expand.append(in_phrase[pos:s])
+            pos = e
+
+            if lcase and lcase["end"] == s and k in self._letters:
+                lcase["end"] = e
+                lcase["value"] += k[0] * (e - s)
+                expand.append("l" * (e - s))
+            else:
+                lcase = None
+                expand.append(k[0] * (e - s))
+
+            part = {
+                "start": s,
+                "end": e,
+                "type": k,
+                "value": m.group()
+            }
+            if k == "lcase":
+                lcase = part
+            parts.append(part)
+        expand.append(in_phrase[pos:])
 
         out_phrase = []
-        parts = []
-        for k, v in sorted(positions.items()):
-            out_phrase.append(v.upper())
-            parts.append(p.get(k))
-        pro_phrase = "".join(out_phrase)
+        short = []
+        for part in parts:
+            k = part["type"][0].upper()
+            l = part["end"] - part["start"]
+            short.append(k)
+            out_phrase.append(k if l == 1 else f"{k}{l}")
 
         return {
             "parts": parts,
-            "short": re.sub('\\d','', pro_phrase),
-            "profile": pro_phrase,
-            "expand": in_phrase
+            "short": "".join(short),
+            "profile": "".join(out_phrase),
+            "expand": "".join(expand)
         }
 
+def _get_metadata(phrase: str) -> dict:
+    """return the metadata for the phrase, for the process pool"""
+    return PhraseTool(in_phrase=phrase).get_metadata()
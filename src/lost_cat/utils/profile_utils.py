@@ -0,0 +1,106 @@
+"""This module provides the profile index, an inverted index of the
+short phrase profile, e.g. "TLI", to the files, grouped by folder
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import bisect
+import logging
+import os
+
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+class ProfileIndex():
+    """An inverted index of the short profile to the cataloged files
+        {
+            <short>: {
+                <folder>: [<key>, ...],
+                ...
+            },
+            ...
+        }
+    the folders for a profile are sorted when queried, and kept until
+    a new folder is added, so the folder queries are a range lookup"""
+    def __init__(self) -> None:
+        self._index = {}
+        self._sorted = {}
+        self._counts = Counter()
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    @classmethod
+    def from_files(cls, files: dict) -> "ProfileIndex":
+        """return an index built from a dict of the files"""
+        index = cls()
+        for key, file_dict in files.items():
+            index.add(key=key, file_dict=file_dict)
+        return index
+
+    def add(self, key: str, file_dict: dict) -> None:
+        """Will add the file to the index, if it has a profile"""
+        short = _get_short(file_dict=file_dict)
+        if short is None:
+            return
+
+        folder = _get_folder(file_dict=file_dict)
+        folders = self._index.get(short)
+        if folders is None:
+            folders = self._index[short] = {}
+
+        if folder not in folders:
+            folders[folder] = []
+            self._sorted.pop(short, None)
+
+        folders[folder].append(key)
+        self._counts[short] += 1
+
+    def remove(self, key: str, file_dict: dict) -> None:
+        """Will remove the file from the index"""
+        short = _get_short(file_dict=file_dict)
+        keys = self._index.get(short, {}).get(_get_folder(file_dict=file_dict))
+        if not keys or key not in keys:
+            return
+
+        keys.remove(key)
+        self._counts[short] -= 1
+        if not self._counts[short]:
+            del self._counts[short]
+
+    def query(self, short: str, folder: str = None) -> list:
+        """return the keys of the files with the short profile, and
+        in or under the folder if passed"""
+        folders = self._index.get(short, {})
+        if folder is None:
+            return [key for keys in folders.values() for key in keys]
+
+        names = self._sorted.get(short)
+        if names is None:
+            names = self._sorted[short] = sorted(folders)
+
+        folder = folder.rstrip("/\\") or folder
+        sub_folder = os.path.join(folder, "")
+        keys = list(folders.get(folder, []))
+        idx = bisect.bisect_left(names, sub_folder)
+        while idx < len(names) and names[idx].startswith(sub_folder):
+            keys.extend(folders[names[idx]])
+            idx += 1
+
+        return keys
+
+    def count(self, short: str) -> int:
+        """return the count of the files with the short profile"""
+        return self._counts.get(short, 0)
+
+    def top(self, n: int = 10) -> list:
+        """return the n most frequent profiles, as [(<short>, <count>), ...]"""
+        return self._counts.most_common(n)
+
+def _get_short(file_dict: dict) -> str:
+    """return the short profile for the file"""
+    return (file_dict.get("profile") or {}).get("short")
+
+def _get_folder(file_dict: dict) -> str:
+    """return the full folder path of the file"""
+    return os.path.dirname(file_dict.get("path") or "")
@@ -0,0 +1,222 @@
+"""This module provides the progress events of the long runs, the runs
+update the counters for each file and an event is sent to the callbacks
+at most once per interval, so the events are not a cost on the hot path
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# the seconds between the events
+PROGRESS_INTERVAL = 1.0
+
+# the updates between the clock checks, the clock is only read
+# on every nth update
+PROGRESS_STRIDE = 16
+
+class NullProgress():
+    """The progress used when the progress events are off, the calls
+    are no-ops"""
+    enabled = False
+
+    def update(self, files: int = 1, size: int = 0, folder: str = None) -> None:
+        pass
+
+    def set_total(self, files: int = None, size: int = None) -> None:
+        pass
+
+    def add_queue(self, name: str, depth: object) -> None:
+        pass
+
+    def finish(self) -> dict:
+        return None
+
+class Progress():
+    """The progress of a run, the counters are updated by the run and an
+    event is sent to the callbacks at most once per interval
+        {
+            "run":          the name of the run, "catalog", "process"...
+            "files":        the files done
+            "bytes":        the bytes done, if the size is known
+            "elapsed":      the seconds since the start
+            "filesec":      the files per second
+            "bytessec":     the bytes per second
+            "folder":       the current folder
+            "queues":       {<name>: <depth>, ...}
+            "total":        the expected files, if known
+            "totalbytes":   the expected bytes, if known
+            "eta":          the seconds to the end, if the total is known
+            "done":         True for the final event
+        }
+    the totals are from the run, a pre-count or the totals saved by the
+    previous run, see build_progress, the clock is only read every stride
+    updates, the updates are not locked and are made from a single thread"""
+    enabled = True
+
+    def __init__(self, run: str, callbacks: list = None, interval: float = PROGRESS_INTERVAL,
+            stride: int = PROGRESS_STRIDE, total: int = None, total_bytes: int = None,
+            totals_uri: str = None) -> None:
+        self._run = run
+        self._callbacks = callbacks or []
+        self._interval = interval
+        self._stride = max(1, stride)
+        self._total = total
+        self._total_bytes = total_bytes
+        self._totals_uri = totals_uri
+        self._queues = {}
+
+        self._files = 0
+        self._bytes = 0
+        self._folder = None
+        self._ticks = 0
+        self._start = time.monotonic()
+        self._next = self._start + interval
+
+    def update(self, files: int = 1, size: int = 0, folder: str = None) -> None:
+        """Will add the files and bytes done, and send an event if the
+        interval has passed"""
+        self._files += files
+        self._bytes += size or 0
+        if folder is not None:
+            self._folder = folder
+
+        self._ticks += 1
+        if self._ticks < self._stride:
+            return
+        self._ticks = 0
+
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self._interval
+            self._emit(now=now, done=False)
+
+    def set_total(self, files: int = None, size: int = None) -> None:
+        """Will set the expected files and bytes, for the eta"""
+        if files is not None:
+            self._total = files
+        if size is not None:
+            self._total_bytes = size
+
+    def add_queue(self, name: str, depth: object) -> None:
+        """Will add a func() that returns the depth of a queue, the
+        depth is only read when an event is sent"""
+        self._queues[name] = depth
+
+    def finish(self) -> dict:
+        """Will send the final event and save the totals for the next run,
+        returns the final event"""
+        event = self._emit(now=time.monotonic(), done=True)
+        if self._totals_uri:
+            save_totals(uri=self._totals_uri, run=self._run, files=self._files,
+                    size=self._bytes)
+        return event
+
+    def _emit(self, now: float, done: bool) -> dict:
+        elapsed = now - self._start
+        event = {
+            "run": self._run,
+            "files": self._files,
+            "bytes": self._bytes,
+            "elapsed": elapsed,
+            "filesec": self._files / elapsed if elapsed else 0.0,
+            "bytessec": self._bytes / elapsed if elapsed else 0.0,
+            "folder": self._folder,
+            "queues": {name: depth() for name, depth in self._queues.items()},
+            "total": self._total,
+            "totalbytes": self._total_bytes,
+            "eta": 0.0 if done else self._get_eta(elapsed=elapsed),
+            "done": done
+        }
+
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception as ex:
+                logger.error("ERROR: progress callback [%s]\n%s", callback, ex)
+        return event
+
+    def _get_eta(self, elapsed: float) -> float:
+        """return the seconds left at the current rate, by the bytes if
+        the bytes total is known, else by the files"""
+        if self._total_bytes and self._bytes:
+            left = self._total_bytes - self._bytes
+            return max(0.0, left * elapsed / self._bytes)
+        if self._total and self._files:
+            left = self._total - self._files
+            return max(0.0, left * elapsed / self._files)
+        return None
+
+def log_callback(level: int = logging.INFO) -> object:
+    """return a callback that logs the events"""
+    def callback(event: dict) -> None:
+        logger.log(level, "%s: %s files %.1f/s %s bytes %.0f/s eta %s [%s] %s",
+                event.get("run"), event.get("files"), event.get("filesec"),
+                event.get("bytes"), event.get("bytessec"), event.get("eta"),
+                event.get("folder"), event.get("queues"))
+    return callback
+
+def build_progress(run: str, options: dict = None, total: int = None) -> object:
+    """return the progress for the run for the "progress" option
+        True:       the events are logged
+        <func(event)>
+        {
+            "log":          True, or the log level
+            "callback":     a func(<event>), or a list of them
+            "interval":     the seconds between the events, default 1.0
+            "stride":       the updates between the clock checks, default 16
+            "precount":     True to count the files before the catalog
+                            run, for the eta, see path_utils.count_files
+            "totals":       the path of a json file for the totals of the
+                            runs, the totals of the last run are used for
+                            the eta if the total is not known
+        }
+    the total, if passed, is the expected files of the run
+    the NullProgress is returned if not set"""
+    config = (options or {}).get("progress")
+    if not config:
+        return NullProgress()
+    if callable(config):
+        config = {"callback": config}
+    elif not isinstance(config, dict):
+        config = {"log": True}
+
+    callbacks = []
+    if config.get("log"):
+        level = config.get("log")
+        callbacks.append(log_callback(level=logging.INFO if level is True else level))
+    if config.get("callback"):
+        callback = config.get("callback")
+        callbacks.extend(callback if isinstance(callback, (list, tuple)) else [callback])
+
+    total_bytes = None
+    if total is None and config.get("totals"):
+        totals = load_totals(uri=config.get("totals")).get(run, {})
+        total = totals.get("files")
+        total_bytes = totals.get("bytes") or None
+
+    return Progress(run=run, callbacks=callbacks,
+            interval=config.get("interval", PROGRESS_INTERVAL),
+            stride=config.get("stride", PROGRESS_STRIDE), total=total,
+            total_bytes=total_bytes, totals_uri=config.get("totals"))
+
+def load_totals(uri: str) -> dict:
+    """return the saved totals of the runs, {<run>: {"files", "bytes"}}"""
+    if not os.path.exists(uri):
+        return {}
+    try:
+        with open(uri, "r", encoding="utf-8") as f_io:
+            return json.load(f_io)
+    except (OSError, ValueError) as ex:
+        logger.error("ERROR: progress totals [%s]\n%s", uri, ex)
+        return {}
+
+def save_totals(uri: str, run: str, files: int, size: int) -> None:
+    """Will save the totals of the run, for the eta of the next run"""
+    totals = load_totals(uri=uri)
+    totals[run] = {"files": files, "bytes": size}
+    with open(uri, "w", encoding="utf-8") as f_io:
+        json.dump(totals, f_io, indent=2)
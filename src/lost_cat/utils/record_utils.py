@@ -0,0 +1,124 @@
+"""This module provides the compact file record, a slotted mapping used
+in place of the file dict, with the repeated strings interned, the dates
+held as epoch seconds and the profile built on demand
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import logging
+import os
+import sys
+import time
+
+from collections.abc import MutableMapping
+
+from lost_cat.utils.path_utils import TIME_FORMAT
+from lost_cat.utils.phrase_utils import PhraseTool
+
+logger = logging.getLogger(__name__)
+
+# the keys of the file and archive member dicts, in order
+RECORD_KEYS = ("type", "zipfile", "path", "root", "folder", "file", "name", "ext",
+        "profile", "accessed", "modified", "created", "size", "mode", "crc",
+        "hash", "files", "metadata", "grouping")
+
+# the keys with the strings repeated across files, these are interned
+INTERN_KEYS = ("zipfile", "root", "folder", "ext")
+
+DATE_KEYS = ("accessed", "modified", "created")
+
+class FileRecord(MutableMapping):
+    """A compact record of a found file or archive member, it can be
+    used as the file dict, and converted back with to_dict
+    - the root, folder, ext and zipfile strings are interned
+    - the dates are held as int epoch seconds, and formatted when read
+      unless the record was built with the "epoch" option
+    - the profile is not held, it's built from the file name, and
+      the profile cache, when read
+    - any other key is held in an extra dict
+    """
+    __slots__ = RECORD_KEYS + ("_extra", "_epoch")
+
+    def __init__(self, epoch: bool = False) -> None:
+        for key in RECORD_KEYS:
+            object.__setattr__(self, key, None)
+        self._extra = None
+        self._epoch = epoch
+
+    @classmethod
+    def from_dict(cls, file_dict: dict, options: dict = None) -> "FileRecord":
+        """return a record for the file dict, the dates are best passed as
+        epoch seconds, the formatted dates are parsed, the archive members
+        in "files" are converted as well"""
+        record = cls(epoch=bool(options and options.get("epoch")))
+        for key, value in file_dict.items():
+            record[key] = value
+        return record
+
+    def __getitem__(self, key: str) -> object:
+        if key in _SLOTS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+
+            if key == "profile":
+                return PhraseTool.profile(phrase=os.path.basename(self.path))
+            if key in DATE_KEYS and not self._epoch:
+                return time.strftime(TIME_FORMAT, time.localtime(value))
+            return value
+
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: object) -> None:
+        if key not in _SLOTS:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+
+        if value is None:
+            pass
+        elif key == "profile":
+            value = True
+        elif key in INTERN_KEYS:
+            value = sys.intern(value)
+        elif key in DATE_KEYS and isinstance(value, str):
+            value = int(time.mktime(time.strptime(value, TIME_FORMAT)))
+        elif key in DATE_KEYS:
+            value = int(value)
+        elif key == "files":
+            value = [v if isinstance(v, FileRecord) else
+                    FileRecord.from_dict(file_dict=v, options={"epoch": self._epoch})
+                    for v in value]
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if key in _SLOTS and getattr(self, key) is not None:
+            setattr(self, key, None)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in RECORD_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.to_dict()})"
+
+    def to_dict(self) -> dict:
+        """return the record as the file dict"""
+        file_dict = dict(self.items())
+        if self.files is not None:
+            file_dict["files"] = [v.to_dict() for v in self.files]
+        return file_dict
+
+_SLOTS = frozenset(RECORD_KEYS)
@@ -0,0 +1,165 @@
+"""This module provides the summary reports for the catalog, the reports
+are computed over the columns of the catalog, see column_utils, with numpy
+if it is installed, else over the arrays in a single pass
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import bisect
+import heapq
+import logging
+import math
+import time
+
+from lost_cat.utils.column_utils import CatalogColumns
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# the columns read by the reports
+REPORT_COLUMNS = ["key", "folder", "ext", "modified", "size"]
+
+# the upper bound, in days, of the age buckets
+AGE_BUCKETS = [1, 7, 30, 90, 365, 365 * 3]
+
+def build_summary(columns: CatalogColumns, options: dict = None) -> dict:
+    """return the summary report for the catalog columns
+    options:
+        "reporttop":    the number of the largest files, default 10
+        "reportages":   the age buckets in days, see AGE_BUCKETS
+        "reportnow":    the epoch time the ages are from, default now
+    returns:
+        {
+            "files": int, "bytes": int,
+            "sizes": [{"min": int, "max": int, "files": int, "bytes": int}, ...],
+            "ext": {<ext>: {"files": int, "bytes": int}, ...},
+            "folder": {<folder>: {"files": int, "bytes": int}, ...},
+            "ages": [{"days": int, "files": int, "bytes": int}, ...],
+            "largest": [(<key>, <size>), ...]
+        }
+    """
+    if not options:
+        options = {}
+
+    sizes = size_histogram(columns=columns)
+    return {
+        "files": len(columns),
+        "bytes": sum(bucket.get("bytes") for bucket in sizes),
+        "sizes": sizes,
+        "ext": group_totals(columns=columns, name="ext"),
+        "folder": group_totals(columns=columns, name="folder"),
+        "ages": age_buckets(columns=columns, buckets=options.get("reportages"),
+                now=options.get("reportnow")),
+        "largest": largest(columns=columns, n=options.get("reporttop", 10)),
+    }
+
+def size_histogram(columns: CatalogColumns) -> list:
+    """return the count and bytes of the files in the power of 2 size buckets,
+    the empty files are in the first bucket, the missing sizes are skipped"""
+    sizes = columns.column("size")
+    if numpy is not None:
+        sizes = numpy.asarray(sizes)
+        sizes = sizes[sizes >= 0]
+        bits = numpy.zeros(len(sizes), dtype="<i8")
+        nonzero = sizes > 0
+        bits[nonzero] = numpy.floor(numpy.log2(sizes[nonzero])).astype("<i8") + 1
+        counts = numpy.bincount(bits)
+        totals = numpy.bincount(bits, weights=sizes)
+        buckets = [(idx, int(counts[idx]), int(totals[idx]))
+                for idx in range(len(counts)) if counts[idx]]
+    else:
+        counts = {}
+        for size in sizes:
+            if size < 0:
+                continue
+            bucket = counts.setdefault(size.bit_length(), [0, 0])
+            bucket[0] += 1
+            bucket[1] += size
+        buckets = [(idx, count, total) for idx, (count, total) in sorted(counts.items())]
+
+    return [{
+        "min": 0 if idx == 0 else 1 << (idx - 1),
+        "max": 0 if idx == 0 else (1 << idx) - 1,
+        "files": count,
+        "bytes": total
+    } for idx, count, total in buckets]
+
+def group_totals(columns: CatalogColumns, name: str) -> dict:
+    """return the count and bytes of the files for each label of the
+    label column, e.g. "ext" or "folder", the missing labels are skipped"""
+    labels = columns.labels(name)
+    codes = columns.column(name)
+    sizes = columns.column("size")
+    if numpy is not None:
+        codes = numpy.asarray(codes)
+        sizes = numpy.asarray(sizes)
+        found = codes >= 0
+        counts = numpy.bincount(codes[found], minlength=len(labels))
+        totals = numpy.bincount(codes[found], weights=numpy.maximum(sizes[found], 0),
+                minlength=len(labels))
+        return {label: {"files": int(counts[idx]), "bytes": int(totals[idx])}
+                for idx, label in enumerate(labels) if counts[idx]}
+
+    counts = [0] * len(labels)
+    totals = [0] * len(labels)
+    for code, size in zip(codes, sizes):
+        if code < 0:
+            continue
+        counts[code] += 1
+        if size > 0:
+            totals[code] += size
+
+    return {label: {"files": counts[idx], "bytes": totals[idx]}
+            for idx, label in enumerate(labels) if counts[idx]}
+
+def age_buckets(columns: CatalogColumns, buckets: list = None, now: float = None) -> list:
+    """return the count and bytes of the files by the days since modified,
+    each bucket is up to the days, the last has "days" None for the older
+    files, the files without a modified date are skipped"""
+    buckets = sorted(buckets or AGE_BUCKETS)
+    now = time.time() if now is None else now
+    modified = columns.column("modified")
+    sizes = columns.column("size")
+    if numpy is not None:
+        modified = numpy.asarray(modified)
+        sizes = numpy.asarray(sizes)
+        found = ~numpy.isnan(modified)
+        ages = (now - modified[found]) / 86400
+        idxs = numpy.searchsorted(buckets, ages, side="left")
+        counts = numpy.bincount(idxs, minlength=len(buckets) + 1)
+        totals = numpy.bincount(idxs, weights=numpy.maximum(sizes[found], 0),
+                minlength=len(buckets) + 1)
+        counts = [int(v) for v in counts]
+        totals = [int(v) for v in totals]
+    else:
+        counts = [0] * (len(buckets) + 1)
+        totals = [0] * (len(buckets) + 1)
+        for mtime, size in zip(modified, sizes):
+            if math.isnan(mtime):
+                continue
+            idx = bisect.bisect_left(buckets, (now - mtime) / 86400)
+            counts[idx] += 1
+            if size > 0:
+                totals[idx] += size
+
+    return [{"days": days, "files": count, "bytes": total}
+            for days, count, total in zip(buckets + [None], counts, totals)]
+
+def largest(columns: CatalogColumns, n: int = 10) -> list:
+    """return the n largest files, as [(<key>, <size>), ...]"""
+    sizes = columns.column("size")
+    if numpy is not None:
+        sizes = numpy.asarray(sizes)
+        n = min(n, len(sizes))
+        if not n:
+            return []
+        idxs = numpy.argpartition(sizes, -n)[-n:]
+        idxs = idxs[numpy.argsort(-sizes[idxs], kind="stable")]
+    else:
+        idxs = heapq.nlargest(n, range(len(sizes)), key=sizes.__getitem__)
+
+    keys = columns.to_list("key")
+    return [(keys[idx], int(sizes[idx])) for idx in idxs if sizes[idx] >= 0]
@@ -0,0 +1,268 @@
+"""A module for the artifact stores, a store holds the found files
+keyed on the path, and is used in place of the in-memory dict
+@author: Dreffed
+copyright adscens.io 2022 / thoughtswin systems 2022
+"""
+import abc
+import json
+import logging
+import sqlite3
+
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+
+logger = logging.getLogger(__name__)
+
+class StoreNotHandled(Exception):
+    """A simple exception to raise for an unknown store"""
+    def __init__(self, label: str, message: str) -> None:
+        self.label = label
+        self.message = message
+        super().__init__()
+
+def build_store(options: dict = None) -> MutableMapping:
+    """Will return the artifact store set in the options,
+        "store":        "memory" (default) | "sqlite" | <ArtifactStore>
+        "storeuri":     the path of the store file, default in memory
+        "storebatch":   the number of files buffered before a write
+    """
+    store = (options or {}).get("store")
+    if not store or store == "memory":
+        return dict()
+
+    if isinstance(store, ArtifactStore):
+        return store
+
+    cls = STORES.get(store)
+    if not cls:
+        raise StoreNotHandled(label=store, message="Artifact store not implemented!")
+
+    return cls(uri=options.get("storeuri", ":memory:"),
+            batch_size=options.get("storebatch", 1000))
+
+def get_hash_key(file_dict: dict) -> str:
+    """return the hashes of the file as a single string,
+    used to index and find matching files"""
+    hashes = file_dict.get("hash")
+    if not hashes:
+        return None
+
+    return "|".join(f"{k}:{v}" for k, v in sorted(hashes.items()))
+
+class ArtifactStore(MutableMapping):
+    """The base class for the stores, a store is a mapping of path to
+    the file dict, with the writes batched and the reads streamed
+    subclasses implement:
+        _get(path)              return the stored file dict or None
+        _write(items)           store a list of (path, file_dict)
+        _delete(path)           remove the path
+        _clear()                remove all the paths
+        _count()                return the number of stored files
+        _iter_items(size)       yield the stored (path, file_dict)
+        find(...)               yield the matching (path, file_dict)
+    """
+    def __init__(self, batch_size: int = 1000) -> None:
+        self._batch_size = batch_size
+        self._pending = {}
+
+    def __getitem__(self, key: str) -> dict:
+        if key in self._pending:
+            return self._pending[key]
+
+        value = self._get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: dict) -> None:
+        self._pending[key] = value
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._pending.pop(key, None)
+        self._delete(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending or self._contains(key)
+
+    def __iter__(self):
+        for key, _ in self.iter_items():
+            yield key
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._count()
+
+    def items(self) -> ItemsView:
+        """return a streamed view of the items"""
+        return _StoreItems(self)
+
+    def values(self) -> ValuesView:
+        """return a streamed view of the values"""
+        return _StoreValues(self)
+
+    def iter_items(self, size: int = None) -> tuple:
+        """yield the stored items, read from the store in pages"""
+        self.flush()
+        yield from self._iter_items(size=size or self._batch_size)
+
+    def clear(self) -> None:
+        """remove all the files from the store"""
+        self._pending = {}
+        self._clear()
+
+    def flush(self) -> None:
+        """Will write the pending files to the store"""
+        if self._pending:
+            self._write(list(self._pending.items()))
+            self._pending = {}
+
+    def close(self) -> None:
+        """Will write the pending files and close the store"""
+        self.flush()
+
+    @abc.abstractmethod
+    def find(self, ext: str = None, zipfile: str = None, hashes: dict = None) -> tuple:
+        """yield the (path, file_dict) for the files matching all the
+        passed values"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> dict:
+        raise NotImplementedError
+
+    def _contains(self, key: str) -> bool:
+        return self._get(key) is not None
+
+    @abc.abstractmethod
+    def _write(self, items: list) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _count(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _iter_items(self, size: int) -> tuple:
+        raise NotImplementedError
+
+class _StoreItems(ItemsView):
+    """a items view that streams from the store"""
+    def __iter__(self):
+        yield from self._mapping.iter_items()
+
+class _StoreValues(ValuesView):
+    """a values view that streams from the store"""
+    def __iter__(self):
+        for _, value in self._mapping.iter_items():
+            yield value
+
+class SQLiteArtifactStore(ArtifactStore):
+    """A sqlite backed artifact store, the file dict is stored as json
+    with the ext, zipfile and hash columns indexed for the lookups"""
+    def __init__(self, uri: str = ":memory:", batch_size: int = 1000) -> None:
+        super().__init__(batch_size=batch_size)
+        self._uri = uri
+        self._conn = sqlite3.connect(uri)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                ext TEXT,
+                zipfile TEXT,
+                hash TEXT,
+                data TEXT)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_ext ON artifacts (ext)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_zipfile ON artifacts (zipfile)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_hash ON artifacts (hash)")
+        self._conn.commit()
+
+    def __str__(self):
+        return f"SQLiteArtifactStore <{self._uri}>"
+
+    def close(self) -> None:
+        """Will write the pending files and close the store"""
+        super().close()
+        self._conn.close()
+
+    def find(self, ext: str = None, zipfile: str = None, hashes: dict = None) -> tuple:
+        """yield the (path, file_dict) for the files matching all the
+        passed values"""
+        self.flush()
+        where = []
+        params = []
+        for col, value in [("ext", ext), ("zipfile", zipfile),
+                ("hash", get_hash_key({"hash": hashes}))]:
+            if value is not None:
+                where.append(f"{col} = ?")
+                params.append(value)
+
+        sql = "SELECT path, data FROM artifacts"
+        if where:
+            sql = "{} WHERE {}".format(sql, " AND ".join(where))
+
+        for path, data in self._conn.execute(sql, params):
+            yield path, json.loads(data)
+
+    def _get(self, key: str) -> dict:
+        row = self._conn.execute("SELECT data FROM artifacts WHERE path = ?", (key,)).fetchone()
+        if row:
+            return json.loads(row[0])
+        return None
+
+    def _contains(self, key: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM artifacts WHERE path = ?",
+                (key,)).fetchone() is not None
+
+    def _write(self, items: list) -> None:
+        # upsert to keep the rowid, so an update does not move the
+        # row while the store is being iterated
+        self._conn.executemany("""INSERT INTO artifacts VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET ext = excluded.ext,
+                    zipfile = excluded.zipfile, hash = excluded.hash,
+                    data = excluded.data""",
+                [(k, v.get("ext"), v.get("zipfile"), get_hash_key(v), json.dumps(v, default=to_json))
+                    for k, v in items])
+        self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM artifacts WHERE path = ?", (key,))
+        self._conn.commit()
+
+    def _clear(self) -> None:
+        self._conn.execute("DELETE FROM artifacts")
+        self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+
+    def _iter_items(self, size: int) -> tuple:
+        # page on the rowid, the writes made while iterating are safe
+        last_id = 0
+        while True:
+            rows = self._conn.execute("""SELECT rowid, path, data FROM artifacts
+                    WHERE rowid > ? ORDER BY rowid LIMIT ?""", (last_id, size)).fetchall()
+            if not rows:
+                break
+
+            for row_id, path, data in rows:
+                last_id = row_id
+                yield path, json.loads(data)
+
+def to_json(obj: object) -> object:
+    """return the json value for the mappings that aren't a dict, e.g. a FileRecord"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+STORES = {
+    "sqlite": SQLiteArtifactStore
+}
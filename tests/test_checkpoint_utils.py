@@ -0,0 +1,130 @@
+"""A test case for the checkpoint module, and the resume of a stopped run"""
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from lost_cat.lost_cat import CheckpointNotFound, LostCat
+from lost_cat.utils.checkpoint_utils import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+class TextParser():
+    """A lifecycle parser for the text files, the parsed files are counted"""
+    parsed = []
+    fail_after = None
+
+    def get_extensions(self) -> list:
+        return [".txt"]
+
+    def set_anonimizer(self, anonimizer: dict) -> None:
+        pass
+
+    def set_export_tags(self, tags: dict) -> None:
+        pass
+
+    def set_group_tags(self, tags: dict) -> None:
+        pass
+
+    def set_alias_tags(self, tags: dict) -> None:
+        pass
+
+    def parse(self, uri: str = None, bytes_io: object = None) -> dict:
+        if self.fail_after is not None and len(TextParser.parsed) >= self.fail_after:
+            raise RuntimeError("parser stopped")
+        TextParser.parsed.append(uri)
+        return {"metadata": {"name": os.path.basename(uri)}, "grouping": {"kind": "text"}}
+
+    def close(self) -> None:
+        pass
+
+class StoppedCat(LostCat):
+    """A LostCat that stops the catalog run after a number of files"""
+    stop_after = 8
+
+    def _add_found(self, fnd_file: dict) -> tuple:
+        if len(self._artifacts["files"]) >= self.stop_after:
+            raise RuntimeError("catalog stopped")
+        return super()._add_found(fnd_file=fnd_file)
+
+class TestCheckpoint(unittest.TestCase):
+    """A container class for the checkpoint test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a tree of four folders of five files"""
+        cls._root = tempfile.mkdtemp()
+        cls._src = os.path.join(cls._root, "src")
+        for folder in ["a", "b", "c", "d"]:
+            os.makedirs(os.path.join(cls._src, folder))
+            for idx in range(5):
+                with open(os.path.join(cls._src, folder, f"notes_{idx}.txt"), "w") as f_io:
+                    f_io.write("lost cat " * idx)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def setUp(self):
+        self._uri = os.path.join(self._root, "checkpoint.db")
+        if os.path.exists(self._uri):
+            os.remove(self._uri)
+        TextParser.parsed = []
+        TextParser.fail_after = None
+
+    def _get_options(self) -> dict:
+        return {"profile": True, "stats": True, "parsechunk": 1, "checkpoint": self._uri,
+                "checkpointinterval": 0, "instrument": {"samples": 100}}
+
+    def test_resume(self):
+        """a stopped catalog and process run is resumed without walking
+        the finished folders or parsing the parsed files"""
+        lc_obj = LostCat(options=self._get_options())
+        self.assertRaises(CheckpointNotFound, lc_obj.resume)
+
+        lc_obj = StoppedCat(options=self._get_options())
+        lc_obj.add_source(label="test", uri=self._src)
+        self.assertRaises(RuntimeError, lc_obj.catalog_artifacts)
+
+        checkpoint = Checkpoint(uri=self._uri, options=self._get_options())
+        counts = checkpoint.get_counts()
+        self.assertEqual(checkpoint.get_state(run="catalog"), "started")
+        checkpoint.close()
+        self.assertEqual(counts.get("folders"), 2)
+        self.assertEqual(counts.get("frontier"), 3)
+        self.assertEqual(counts.get("files"), 9)
+
+        # resume the catalog, and stop the process after 5 files
+        TextParser.fail_after = 5
+        lc_obj = LostCat(options=self._get_options())
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.add_parser(label="text", base_class=TextParser)
+        self.assertRaises(RuntimeError, lc_obj.resume, process=True)
+        self.assertEqual(lc_obj.fetch_stats().get("list").get("count"), 3)
+        self.assertEqual(len(lc_obj.fetch_catalog().get("files")), 20)
+
+        # resume the process, only the files not parsed are parsed
+        TextParser.fail_after = None
+        lc_obj = LostCat(options=self._get_options())
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.add_parser(label="text", base_class=TextParser)
+        result = lc_obj.resume()
+        self.assertNotIn("list", lc_obj.fetch_stats())
+        self.assertEqual(len(TextParser.parsed), 20)
+        self.assertEqual(len(set(TextParser.parsed)), 20)
+        self.assertDictEqual(result.get("processed"), {".txt": 20})
+        self.assertEqual(result.get("cataloged"), 20)
+        self.assertEqual(lc_obj.fetch_groups().count("text"), 20)
+        for file_obj in lc_obj.fetch_catalog().get("files").values():
+            self.assertEqual(file_obj.get("metadata").get("name"), file_obj.get("file"))
+
+        # a new run clears the checkpoint, and the parallel walker is not used
+        lc_obj = LostCat(options=dict(self._get_options(), parallel=True))
+        lc_obj.add_source(label="test", uri=self._src)
+        with self.assertLogs("lost_cat.lost_cat", level="WARNING"):
+            lc_obj.catalog_artifacts()
+        self.assertEqual(lc_obj.fetch_stats().get("list").get("count"), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""A test case for the columnar catalog module"""
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import zipfile
+from unittest import mock
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils import column_utils
+from lost_cat.utils.column_utils import CatalogColumns, CompressionNotHandled
+
+logger = logging.getLogger(__name__)
+
+# the columns are tested with numpy, if installed, and the pure python arrays
+NUMPY = {column_utils.numpy, None}
+
+class TestCatalogColumns(unittest.TestCase):
+    """A container class for the columnar catalog test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the test folder"""
+        cls._path = tempfile.mkdtemp()
+        cls._src = os.path.join(cls._path, "src")
+        os.makedirs(os.path.join(cls._src, "sub"))
+        for idx in range(4):
+            with open(os.path.join(cls._src, "sub" if idx % 2 else "", f"file_{idx}.txt"),
+                    "w", encoding="utf-8") as f_io:
+                f_io.write("data " * idx)
+        with zipfile.ZipFile(os.path.join(cls._src, "archive.zip"), "w") as z_io:
+            z_io.writestr("inner/doc.txt", "zipped")
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the test folder"""
+        shutil.rmtree(cls._path)
+
+    def _catalog(self, options: dict) -> LostCat:
+        lc_obj = LostCat(options=options)
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.catalog_artifacts()
+        return lc_obj
+
+    def test_export_import(self):
+        """the catalog is the same after the export and import"""
+        for numpy in NUMPY:
+            with self.subTest(numpy=numpy is not None), \
+                    mock.patch.object(column_utils, "numpy", numpy):
+                for options in [{"profile": True, "stats": True, "generatehash": True},
+                        {"stats": True, "epoch": True}]:
+                    lc_obj = self._catalog(options=options)
+                    files = lc_obj.fetch_catalog().get("files")
+
+                    for compression in [None, "gzip", "lzma"]:
+                        uri = os.path.join(self._path, f"export_{compression}")
+                        manifest = lc_obj.export_catalog(uri=uri, compression=compression)
+                        self.assertEqual(manifest.get("count"), 6)
+
+                        lc_new = LostCat(options=options)
+                        lc_new.import_catalog(uri=uri)
+                        self.assertDictEqual(lc_new.fetch_catalog().get("files"), files)
+
+                with self.assertRaises(CompressionNotHandled):
+                    lc_obj.export_catalog(uri=uri, compression="rar")
+
+    def test_columns(self):
+        """the loaded columns are arrays, with the labels coded"""
+        for numpy in NUMPY:
+            with self.subTest(numpy=numpy is not None), \
+                    mock.patch.object(column_utils, "numpy", numpy):
+                lc_obj = self._catalog(options={"stats": True})
+                uri = os.path.join(self._path, "columns")
+                lc_obj.export_catalog(uri=uri)
+
+                columns = CatalogColumns.load(uri=uri)
+                self.assertEqual(len(columns), 6)
+                self.assertFalse(columns.epoch)
+
+                exts = columns.labels("ext")
+                self.assertListEqual(sorted(exts), [".txt", ".zip"])
+                codes = list(columns.column("ext"))
+                self.assertEqual(codes.count(exts.index(".txt")), 5)
+                self.assertEqual(sum(columns.column("size")), sum(f.get("size")
+                        for f in lc_obj.fetch_catalog().get("files").values()))
+                self.assertEqual(columns.to_list("zipfile").count(None), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
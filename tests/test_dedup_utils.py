@@ -0,0 +1,62 @@
+"""A test case for the duplicate detection module"""
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import zipfile
+from lost_cat.lost_cat import LostCat
+
+logger = logging.getLogger(__name__)
+
+class TestDuplicates(unittest.TestCase):
+    """A container class for the duplicate detection test cases"""
+
+    def setUp(self):
+        """build the files, with the copies on disk and in a zip"""
+        self._root = tempfile.mkdtemp()
+        big = os.urandom(5000)
+        files = {
+            "big_a.bin": big,
+            "big_b.bin": big,
+            "big_diff.bin": big[:2500] + b"x" + big[2501:],
+            "small_a.txt": b"lost cat",
+            "small_b.txt": b"lost cat",
+            "small_c.txt": b"lost dog",
+            "unique.txt": b"a unique size",
+        }
+        for name, data in files.items():
+            with open(os.path.join(self._root, name), "wb") as f_io:
+                f_io.write(data)
+
+        with zipfile.ZipFile(os.path.join(self._root, "copies.zip"), "w",
+                compression=zipfile.ZIP_DEFLATED) as z_io:
+            z_io.writestr("big_c.bin", big)
+            z_io.writestr("docs/small_d.txt", b"lost cat")
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def test_find_duplicates(self):
+        """the copies should be grouped, the near copy is not"""
+        l_cat = LostCat(options={"stats": True, "dedupsample": 1024})
+        l_cat.add_source(label="test", uri=self._root)
+        l_cat.catalog_artifacts()
+
+        result = l_cat.find_duplicates()
+        groups = sorted(sorted(os.path.basename(f) for f in g.get("files"))
+                for g in result.get("groups"))
+
+        self.assertListEqual(groups, [["big_a.bin", "big_b.bin", "big_c.bin"],
+                ["small_a.txt", "small_b.txt", "small_d.txt"]])
+        self.assertEqual(result.get("duplicates"), 4)
+        self.assertEqual(result.get("wasted"), 10016)
+
+        # the unique size is never read, the near copy differs
+        # in the middle so it's only split out on the full hash
+        self.assertEqual(result.get("stats").get("sized"), 8)
+        self.assertEqual(result.get("stats").get("hashed"), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
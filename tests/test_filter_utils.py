@@ -0,0 +1,64 @@
+"""A test case for the file filter module"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import logging
+from lost_cat.utils.filter_utils import get_filter
+from lost_cat.utils.path_utils import is_include, scan_entries, scan_files, scan_files_parallel
+
+logger = logging.getLogger(__name__)
+
+class TestFileFilter(unittest.TestCase):
+    """A container class for the file filter test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a small tree, with a folder to prune"""
+        cls._root = tempfile.mkdtemp()
+        for folder in ["docs", os.path.join("docs", "old"), ".git", "images"]:
+            os.makedirs(os.path.join(cls._root, folder))
+        for name, size in [("docs/readme.txt", 10), ("docs/notes.TXT", 2000),
+                ("docs/old/draft.txt", 10), ("docs/report.pdf", 10),
+                (".git/config.txt", 10), ("images/IMG_0001.jpg", 10)]:
+            with open(os.path.join(cls._root, *name.split("/")), "w") as f_io:
+                f_io.write("x" * size)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def test_filter(self):
+        """the compiled conditions"""
+        options = {"filter": {"exts": [".txt", ".jpg"], "excludenames": ["draft*"],
+                "maxsize": 1000, "prune": [".git"]}}
+        file_filter = get_filter(options=options)
+        self.assertIs(get_filter(options=options), file_filter)
+        self.assertIsNone(get_filter(options={}))
+
+        self.assertTrue(file_filter.include_name(name="readme.txt", path="/docs/readme.txt"))
+        self.assertFalse(file_filter.include_name(name="draft.txt", path="/docs/draft.txt"))
+        self.assertFalse(file_filter.include_name(name="report.pdf", path="/docs/report.pdf"))
+        self.assertFalse(file_filter.include_stat(size=2000, mtime=0))
+        self.assertFalse(file_filter.include_folder(path=os.path.join(self._root, ".git")))
+
+        # the legacy regex is matched on the file name
+        options = {"filter": {"regex": r"IMG_\d+", "after": "2000-01-01"}}
+        self.assertTrue(is_include(file_dict={"path": "/images/IMG_0001.jpg", "size": 1,
+                "modified": time.time()}, options=options))
+        self.assertFalse(is_include(file_dict={"path": "/images/cat.jpg", "size": 1,
+                "modified": time.time()}, options=options))
+
+    def test_walkers(self):
+        """the walkers apply the filter, and prune the folders"""
+        options = {"filter": {"exts": [".txt"], "excludepaths": ["*/old/*"],
+                "maxsize": 1000, "prune": [".git"]}}
+        expected = [os.path.join(self._root, "docs", "readme.txt")]
+        for scanner in [scan_files, scan_entries, scan_files_parallel]:
+            found = [f.get("path") for f in scanner(self._root, options=options)]
+            self.assertListEqual(found, expected, scanner.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""A test case for the group index module"""
+import unittest
+import logging
+from lost_cat.utils.group_utils import GroupIndex, MISSING_GROUP
+
+logger = logging.getLogger(__name__)
+
+class TestGroupIndex(unittest.TestCase):
+    """A container class for the group index test cases"""
+
+    def test_group_index(self):
+        """the files are appended to the buckets, with the node counts"""
+        index = GroupIndex()
+        groupings = [
+            {"modality": "CT", "body": "HEAD", "series": "1"},
+            {"modality": "CT", "body": "HEAD", "series": "1"},
+            {"modality": "CT", "body": "HEAD", "series": "2"},
+            {"modality": "CT", "body": "CHEST", "series": "3"},
+            {"modality": "MR", "body": "", "series": "4"},
+        ]
+        for idx, grouping in enumerate(groupings):
+            index.add(grouping=grouping, file_obj={"path": f"file_{idx}"})
+
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.count("CT"), 4)
+        self.assertEqual(index.count("CT", "HEAD"), 3)
+        self.assertEqual(index.count("XR"), 0)
+        self.assertListEqual(index.children("CT"), ["HEAD", "CHEST"])
+        self.assertListEqual([f.get("path") for f in index.files("CT", "HEAD", "1")],
+                ["file_0", "file_1"])
+
+        # the tree view, rebuilt after an add
+        self.assertEqual(len(index["CT"]["HEAD"]["1"]["files"]), 2)
+        self.assertIn(MISSING_GROUP, index.get("MR"))
+        index.add(grouping=groupings[0], file_obj={"path": "file_5"})
+        self.assertEqual(len(index.to_tree()["CT"]["HEAD"]["1"]["files"]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
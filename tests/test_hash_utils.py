@@ -0,0 +1,57 @@
+"""A test case for the hash utils module"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from lost_cat.utils.hash_utils import HashNotHandled, hash_file
+from lost_cat.utils.path_utils import make_hash, scan_files
+
+logger = logging.getLogger(__name__)
+
+class TestHashUtils(unittest.TestCase):
+    """A container class for the hash utils test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a few files, larger than the buffer"""
+        cls._root = tempfile.mkdtemp()
+        for idx in range(6):
+            with open(os.path.join(cls._root, f"file_{idx}.bin"), "wb") as f_io:
+                f_io.write(os.urandom(1000 * idx + 7))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def test_hash_file(self):
+        """the hashes should match hashlib, with a small buffer"""
+        uri = os.path.join(self._root, "file_5.bin")
+        with open(uri, "rb") as f_io:
+            data = f_io.read()
+
+        result = hash_file(uri=uri, algorithms=["blake2b", "sha256"], buff_size=512)
+        self.assertDictEqual(result, {
+            "BLAKE2B": hashlib.blake2b(data).hexdigest(),
+            "SHA256": hashlib.sha256(data).hexdigest()
+        })
+        self.assertEqual(make_hash(uri=uri).get("MD5"), hashlib.md5(data).hexdigest())
+        self.assertEqual(hash_file(uri=uri + ".missing").get("SHA1"), "Missing file")
+
+        with self.assertRaises(HashNotHandled):
+            hash_file(uri=uri, algorithms=["rot13"])
+
+    def test_hash_workers(self):
+        """the hash pool should give the same hashes as the walk"""
+        options = {"generatehash": True, "stats": True, "maxhashsize": 3000}
+        expected = {f.get("path"): f.get("hash") for f in scan_files(self._root, options=options)}
+
+        options["hashworkers"] = 3
+        result = {f.get("path"): f.get("hash") for f in scan_files(self._root, options=options)}
+        self.assertDictEqual(result, expected)
+        self.assertEqual(len([h for h in result.values() if h]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""A test case for the scan index module"""
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import zipfile
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.hash_utils import hash_file
+from lost_cat.utils.index_utils import ScanIndex
+from lost_cat.utils.path_utils import scan_entries
+
+logger = logging.getLogger(__name__)
+
+class TestScanIndex(unittest.TestCase):
+    """A container class for the scan index test cases"""
+
+    def setUp(self):
+        """build a small tree of files"""
+        self._root = tempfile.mkdtemp()
+        self._folder = os.path.join(self._root, "data")
+        os.makedirs(os.path.join(self._folder, "sub"))
+        for idx in range(3):
+            for folder in [self._folder, os.path.join(self._folder, "sub")]:
+                with open(os.path.join(folder, f"file_{idx}.txt"), "w") as f_io:
+                    f_io.write(f"file {idx}")
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _scan(self, options: dict = None) -> dict:
+        """run an incremental scan and return the counts"""
+        options = options or {"profile": True, "stats": True}
+        index = ScanIndex(uri=os.path.join(self._root, "index.db"), options=options)
+        files = list(scan_entries(self._folder, options=options, index=index))
+        counts = index.get_counts()
+        index.close()
+
+        self.assertEqual(len(files), counts.get("added") + counts.get("modified") \
+                + counts.get("unchanged"))
+        return counts
+
+    def test_incremental(self):
+        """the rescan should only pick up the changes"""
+        self.assertEqual(self._scan().get("added"), 6)
+        self.assertEqual(self._scan().get("unchanged"), 6)
+
+        with open(os.path.join(self._folder, "file_0.txt"), "w") as f_io:
+            f_io.write("the file has changed")
+        with open(os.path.join(self._folder, "file_9.txt"), "w") as f_io:
+            f_io.write("a new file")
+        shutil.rmtree(os.path.join(self._folder, "sub"))
+
+        self.assertDictEqual(self._scan(),
+                {"added": 1, "modified": 1, "deleted": 3, "unchanged": 2})
+
+    def test_options(self):
+        """a change to the options that change the file details clears the index"""
+        self.assertEqual(self._scan().get("added"), 6)
+        for options in [{"profile": True, "stats": True, "nested": 2},
+                {"profile": True, "stats": True, "nested": 2, "nestedsize": 1024},
+                {"profile": True, "stats": True, "generatehash": True, "hashalgos": ["md5"]},
+                {"profile": True, "stats": True, "generatehash": True, "hashalgos": ["sha256"]}]:
+            self.assertEqual(self._scan(options=options).get("added"), 6)
+            self.assertEqual(self._scan(options=options).get("unchanged"), 6)
+
+    def test_modified(self):
+        """the modified files, and archive members, replace the catalog entries"""
+        folder = os.path.join(self._root, "catalog")
+        os.makedirs(folder)
+        uri = os.path.join(folder, "a.txt")
+        zip_uri = os.path.join(folder, "z.zip")
+
+        def write(text: str, members: list) -> None:
+            with open(uri, "w") as f_io:
+                f_io.write(text)
+            with zipfile.ZipFile(zip_uri, "w") as z_io:
+                for member in members:
+                    z_io.writestr(member, member)
+
+        write(text="lost cat", members=["old.txt"])
+        for store in [{}, {"store": "sqlite", "storeuri": os.path.join(self._root, "store.db")}]:
+            options = {"profile": True, "stats": True, "generatehash": True,
+                    "index": os.path.join(self._root, f"catalog_{len(store)}.db"), **store}
+            lc_obj = LostCat(options=options)
+            lc_obj.add_source(label="test", uri=folder)
+            self.assertEqual(lc_obj.catalog_artifacts().get("added"), 2)
+
+            write(text="the lost cat was found", members=["new.txt"])
+            if store:
+                lc_obj.close()
+                lc_obj = LostCat(options=options)
+                lc_obj.add_source(label="test", uri=folder)
+            result = lc_obj.catalog_artifacts()
+            self.assertEqual(result.get("modified"), 2)
+
+            files = lc_obj.fetch_catalog().get("files")
+            self.assertEqual(files[uri].get("size"), os.path.getsize(uri))
+            self.assertDictEqual(files[uri].get("hash"), hash_file(uri=uri))
+            self.assertListEqual(sorted(files), sorted([uri, zip_uri, f"{zip_uri}!/new.txt"]))
+            self.assertEqual(sum(count for _, count in lc_obj.profile_report()), 2)
+            lc_obj.close()
+            write(text="lost cat", members=["old.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""A test case for the instrumentation module"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import zipfile
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.instrument_utils import Instrument, NullInstrument, get_instrument
+
+logger = logging.getLogger(__name__)
+
+class TestInstrument(unittest.TestCase):
+    """A container class for the instrumentation test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a small tree of files and a zip file"""
+        cls._root = tempfile.mkdtemp()
+        cls._src = os.path.join(cls._root, "src")
+        os.makedirs(os.path.join(cls._src, "sub"))
+        for idx in range(5):
+            with open(os.path.join(cls._src, "sub", f"IMG_{idx:04}.txt"), "w") as f_io:
+                f_io.write("lost cat " * idx)
+        with zipfile.ZipFile(os.path.join(cls._src, "archive.zip"), "w") as z_io:
+            z_io.writestr("docs/readme.txt", "a document")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def test_stages(self):
+        """the stages of a catalog run are sent to the sinks"""
+        runs = []
+        uri = os.path.join(self._root, "stats.json")
+        # the walker and hash threads record to the instrument of the run
+        for walker in [{}, {"scandir": True}, {"scandir": True, "hashworkers": 2},
+                {"parallel": True, "processes": 0}]:
+            lc_obj = LostCat(options={"profile": True, "stats": True, "generatehash": True,
+                    **walker,
+                    "instrument": {"json": uri, "tracemalloc": True,
+                        "callback": lambda name, stats: runs.append(name)}})
+            lc_obj.add_source(label="test", uri=self._src)
+            lc_obj.catalog_artifacts()
+
+            stats = lc_obj.fetch_stats()
+            self.assertEqual(stats.get("list").get("count"), 2)
+            self.assertEqual(stats.get("metadata").get("count"), 6)
+            self.assertEqual(stats.get("archive").get("count"), 1)
+            self.assertEqual(stats.get("hash").get("count"), 6)
+            self.assertEqual(stats.get("hash").get("bytes"), sum(f.get("size")
+                    for f in lc_obj.fetch_catalog().get("files").values() if "zipfile" not in f))
+            self.assertEqual(stats.get("read").get("bytes"), stats.get("hash").get("bytes"))
+            self.assertLessEqual(stats.get("hash").get("p50"), stats.get("hash").get("max"))
+            self.assertGreater(stats.get("runs").get("catalog").get("peak"), 0)
+
+        self.assertListEqual(runs, ["catalog"] * 4)
+        with open(uri, "r", encoding="utf-8") as f_io:
+            self.assertEqual(json.load(f_io).get("run"), "catalog")
+
+        # the instrument is only current for the run
+        self.assertIsInstance(get_instrument(), NullInstrument)
+
+    def test_cprofile(self):
+        """the run profile is added to the stats"""
+        instrument = Instrument(cprofile=True)
+        lc_obj = LostCat(options={"instrument": instrument})
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.catalog_artifacts()
+        self.assertIn("function calls", instrument.get_stats().get("runs").get("catalog").get(
+                "profile"))
+
+
+if __name__ == '__main__':
+    unittest.main()
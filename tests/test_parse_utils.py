@@ -0,0 +1,207 @@
+"""A test case for the parser runs of process_artifacts"""
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import logging
+import zipfile
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.parse_utils import build_units
+
+logger = logging.getLogger(__name__)
+
+class TextParser():
+    """A simple parser for the text files, the metadata is the line count
+    and the files are grouped by the first word"""
+    def __init__(self, uri: str = None, bytes_io: object = None) -> None:
+        self._uri = uri
+        self._bytes_io = bytes_io
+
+    def get_extensions(self) -> list:
+        return [".txt"]
+
+    def set_anonimizer(self, anonimizer: dict) -> None:
+        pass
+
+    def set_export_tags(self, tags: dict) -> None:
+        pass
+
+    def set_group_tags(self, tags: dict) -> None:
+        pass
+
+    def set_alias_tags(self, tags: dict) -> None:
+        pass
+
+    def get_metadata(self) -> dict:
+        if self._bytes_io:
+            data = self._bytes_io.read()
+        else:
+            with open(self._uri, "rb") as f_io:
+                data = f_io.read()
+        text = data.decode("utf-8")
+        return {
+            "metadata": {"lines": len(text.splitlines())},
+            "grouping": {"word": text.split(" ", 1)[0]}
+        }
+
+    def close(self) -> None:
+        pass
+
+class LifecycleParser(TextParser):
+    """The text parser, configured once and reused for each file, the
+    pool workers log the close to the folder set in the environment"""
+    created = 0
+    configured = 0
+    closed = 0
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._closed = False
+        LifecycleParser.created += 1
+
+    def set_anonimizer(self, anonimizer: dict) -> None:
+        LifecycleParser.configured += 1
+
+    def parse(self, uri: str = None, bytes_io: object = None) -> dict:
+        if self._closed:
+            raise ValueError("closed parser")
+        self._uri = uri
+        self._bytes_io = bytes_io
+        return self.get_metadata()
+
+    def close(self) -> None:
+        self._closed = True
+        LifecycleParser.closed += 1
+        if os.environ.get("LOST_CAT_CLOSED"):
+            with open(os.path.join(os.environ.get("LOST_CAT_CLOSED"), str(os.getpid())), "w"):
+                pass
+
+class TestParseUnits(unittest.TestCase):
+    """A container class for the parser run test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the test folder, with the files and archives"""
+        cls._path = tempfile.mkdtemp()
+        for idx in range(10):
+            with open(os.path.join(cls._path, f"file_{idx}.txt"), "w", encoding="utf-8") as f_io:
+                f_io.write(f"word{idx % 3} text\n" * (idx + 1))
+
+        with zipfile.ZipFile(os.path.join(cls._path, "archive.zip"), "w") as z_io:
+            z_io.writestr("zip_a.txt", "zip one\ntwo")
+            z_io.writestr("zip_b.txt", "zip one")
+        with tarfile.open(os.path.join(cls._path, "backup.tar.gz"), "w:gz") as t_io:
+            t_io.add(os.path.join(cls._path, "file_1.txt"), arcname="tar/file_1.txt")
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the test folder"""
+        shutil.rmtree(cls._path)
+
+    def _process(self, options: dict, parser: object = TextParser, runs: int = 1) -> dict:
+        lc_obj = LostCat(options=options)
+        lc_obj.add_source(label="test", uri=self._path)
+        lc_obj.add_parser(label="text", base_class=parser)
+        lc_obj.catalog_artifacts()
+        for _ in range(runs):
+            data = lc_obj.process_artifacts()
+        self.assertDictEqual(data, {".txt": 13, ".zip": 1, ".gz": 1})
+        self.assertEqual(lc_obj.fetch_groups().count(), 13 * runs)
+        self.assertEqual(len(lc_obj.fetch_groups().files("word1")), 4 * runs)
+        return dict(lc_obj.fetch_catalog().get("files").items())
+
+    def test_parallel(self):
+        """the parallel run matches the serial run"""
+        files = self._process(options={"profile": True})
+        for file_dict in files.values():
+            if file_dict.get("ext") == ".txt":
+                self.assertIn("lines", file_dict.get("metadata"))
+
+        self.assertEqual(files[os.path.join(self._path, "archive.zip!/zip_a.txt")].get("metadata"),
+                {"lines": 2})
+        self.assertEqual(files[os.path.join(self._path, "backup.tar.gz!/tar/file_1.txt")].get(
+                "grouping"), {"word": "word1"})
+
+        for options in [{"profile": True, "parseworkers": 2, "parsechunk": 3},
+                {"profile": True, "parseworkers": 1}]:
+            self.assertDictEqual(self._process(options=options), files)
+
+        # the store is streamed to the units, the archive member lists
+        # of the stored archives are copies so only the metadata is matched
+        stored = self._process(options={"profile": True, "parseworkers": 2, "store": "sqlite",
+                "storebatch": 4})
+        self.assertDictEqual({k: v.get("metadata") for k, v in stored.items()},
+                {k: v.get("metadata") for k, v in files.items()})
+
+    def test_units(self):
+        """the units are built as the files are read"""
+        read = []
+
+        class Files(dict):
+            def items(self):
+                for f_key, file_obj in super().items():
+                    read.append(f_key)
+                    yield f_key, file_obj
+
+        files = Files({f"/data/file_{idx}.txt": {"path": f"/data/file_{idx}.txt", "ext": ".txt"}
+                for idx in range(5)})
+        files["/data/a.zip!/a.txt"] = {"path": "a.txt", "zipfile": "/data/a.zip", "ext": ".txt"}
+        data = {}
+        units = build_units(files=files, parse_ext={".txt": ["text"]},
+                options={"parsechunk": 2}, data=data)
+
+        self.assertEqual(next(units), ("files", [
+                ("/data/file_0.txt", {"path": "/data/file_0.txt", "ext": ".txt"}),
+                ("/data/file_1.txt", {"path": "/data/file_1.txt", "ext": ".txt"})]))
+        self.assertEqual(len(read), 2)
+
+        units = list(units)
+        self.assertEqual(len(units), 3)
+        self.assertEqual(units[-1], ("archive", "/data/a.zip", [("/data/a.zip", [
+                ("/data/a.zip!/a.txt", {"path": "a.txt", "zipfile": "/data/a.zip", "ext": ".txt"})])]))
+        self.assertDictEqual(data, {".txt": 6})
+
+    def test_lifecycle(self):
+        """the lifecycle parser is made and configured once per run, and
+        closed at the end of the run, or as the pool worker exits"""
+        files = self._process(options={"profile": True})
+        LifecycleParser.created = 0
+        LifecycleParser.configured = 0
+        LifecycleParser.closed = 0
+        self.assertDictEqual(self._process(options={"profile": True},
+                parser=LifecycleParser, runs=2), files)
+
+        # one made by add_parser for the extensions, and one per run
+        self.assertEqual(LifecycleParser.created, 3)
+        self.assertEqual(LifecycleParser.configured, 2)
+        self.assertEqual(LifecycleParser.closed, 2)
+
+        closed = tempfile.mkdtemp()
+        os.environ["LOST_CAT_CLOSED"] = closed
+        try:
+            self.assertDictEqual(self._process(options={"profile": True, "parseworkers": 2},
+                    parser=LifecycleParser), files)
+            self.assertGreater(len(os.listdir(closed)), 0)
+        finally:
+            del os.environ["LOST_CAT_CLOSED"]
+            shutil.rmtree(closed)
+
+    def test_pipeline(self):
+        """the pipeline run matches the catalog and process run"""
+        files = self._process(options={"profile": True})
+        for options in [{"profile": True, "parsechunk": 4, "pipelinequeue": 2},
+                {"profile": True, "parseworkers": 2, "index": f"{self._path}_index.db"}]:
+            lc_obj = LostCat(options=options)
+            lc_obj.add_source(label="test", uri=self._path)
+            lc_obj.add_parser(label="text", base_class=TextParser)
+            result = lc_obj.run_pipeline()
+            self.assertEqual(result.get("files"), 12)
+            self.assertEqual(result.get("zipped"), 3)
+            self.assertDictEqual(result.get("processed"), {".txt": 13, ".zip": 1, ".gz": 1})
+            self.assertDictEqual(lc_obj.fetch_catalog().get("files"), files)
+        os.remove(f"{self._path}_index.db")
+
+
+if __name__ == '__main__':
+    unittest.main()
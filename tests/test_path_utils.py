@@ -1,8 +1,15 @@
 """A test case for the path utils module"""
 import os
+import shutil
+import tempfile
 import unittest
+import io
 import logging
-from lost_cat.utils.path_utils import build_path
+import tarfile
+import zipfile
+from unittest import mock
+from lost_cat.utils import path_utils
+from lost_cat.utils.path_utils import ArchivePool, build_path, get_archive_ext, scan_zip, stream_tar, scan_entries, scan_files, scan_files_parallel
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +36,121 @@ class TestBuildPath(unittest.TestCase):
 
         self.assertGreater(len(result.get("folders",[])), 2, "Folders incorrect length")
 
+class TestScanFiles(unittest.TestCase):
+    """A container class for the scan files test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a small tree of files and a zip file"""
+        cls._root = tempfile.mkdtemp()
+        for idx in range(3):
+            folder = os.path.join(cls._root, f"folder_{idx}", "sub Folder")
+            os.makedirs(folder)
+            for f_idx in range(4):
+                with open(os.path.join(folder, f"IMG_{f_idx:04}.txt"), "w") as f_io:
+                    f_io.write("lost cat " * f_idx)
+
+        with zipfile.ZipFile(os.path.join(cls._root, "archive.zip"), "w") as z_io:
+            z_io.writestr("docs/readme.txt", "a document")
+
+        with tarfile.open(os.path.join(cls._root, "backup.tar.gz"), "w:gz") as t_io:
+            t_io.add(os.path.join(cls._root, "folder_0"), arcname="folder_0")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def test_scan_parallel(self):
+        """the parallel walker should find the same files as the walker"""
+        options = {"profile": True, "stats": True, "generatehash": True}
+        expected = {f.get("path"): f for f in self._scan(scan_files, options)}
+
+        for p_options in [{"workers": 4, "processes": 2}, {"workers": 2, "processes": 0},
+                {"workers": 2, "processes": 0, "hashworkers": 2}]:
+            p_options.update(options)
+            result = {f.get("path"): f for f in self._scan(scan_files_parallel, p_options)}
+            self.assertEqual(len(result), 14)
+            self.assertDictEqual(result, expected)
+
+    def test_scan_entries(self):
+        """the scandir walker should match the walker, in the same order"""
+        options = {"profile": True, "stats": True, "epoch": True}
+        expected = self._scan(scan_files, options)
+        result = self._scan(scan_entries, options)
+
+        self.assertEqual([f.get("path") for f in result], [f.get("path") for f in expected])
+        self.assertListEqual(result, expected)
+        self.assertIsInstance(result[0].get("modified"), float)
+
+    def test_archive_pool(self):
+        """the pool should keep the archive open, and close on eviction"""
+        uri = os.path.join(self._root, "archive.zip")
+        with ArchivePool(size=1) as pool:
+            for _ in range(3):
+                bytes_io = pool.fetch(uri=uri, item_path="docs/readme.txt")
+                self.assertEqual(bytes_io.read(), b"a document")
+            self.assertEqual(pool.get_opened(), 1)
+
+            # a seekable copy is spilled to disk over the max size
+            bytes_io = pool.fetch(uri=uri, item_path="docs/readme.txt", seekable=True, max_size=4)
+            bytes_io.seek(2)
+            self.assertEqual(bytes_io.read(), b"document")
+            self.assertTrue(bytes_io._rolled)
+
+            zip_obj = pool.get(uri=uri)
+        self.assertIsNone(zip_obj.fp)
+
+    def test_scan_tar(self):
+        """the compressed tars should be scanned and streamed"""
+        self.assertEqual(get_archive_ext("/data/Backup.TAR.GZ"), ".tar.gz")
+        self.assertEqual(get_archive_ext("/data/backup.tgz"), ".tgz")
+        self.assertIsNone(get_archive_ext("/data/notes.gz"))
+
+        uri = os.path.join(self._root, "backup.tar.gz")
+        files = {f.get("path"): f for f in scan_files(self._root)}
+        members = [f.get("path") for f in files.get(uri, {}).get("files", [])]
+        self.assertEqual(len(members), 4)
+
+        names = set(members[1:3])
+        streamed = {m.name: f_io.read() for m, f_io in stream_tar(uri=uri, names=names)}
+        self.assertEqual(set(streamed), names)
+        self.assertEqual(streamed.get("folder_0/sub Folder/IMG_0001.txt"), b"lost cat ")
+
+    def test_scan_nested(self):
+        """the nested archives are scanned to the depth and read by the pool"""
+        inner_io = io.BytesIO()
+        with zipfile.ZipFile(inner_io, "w") as z_io:
+            z_io.writestr("inner/readme.txt", "an inner document")
+
+        uri = os.path.join(tempfile.mkdtemp(), "outer.zip")
+        with zipfile.ZipFile(uri, "w") as z_io:
+            z_io.writestr("docs/inner.zip", inner_io.getvalue())
+
+        self.assertEqual(len(scan_zip(uri=uri)), 1)
+        self.assertEqual(len(scan_zip(uri=uri, options={"nested": 1, "nestedsize": 10})), 1)
+
+        files = scan_zip(uri=uri, options={"nested": 1})
+        self.assertEqual(files[1].get("path"), "docs/inner.zip!/inner/readme.txt")
+        self.assertEqual(files[1].get("folder"), "inner")
+
+        # the nested zip is spooled to the "spoolsize" option
+        with mock.patch.object(path_utils, "spool_file", wraps=path_utils.spool_file) as spool:
+            self.assertEqual(len(scan_zip(uri=uri, options={"nested": 1, "spoolsize": 16})), 2)
+            self.assertEqual(spool.call_args[1].get("max_size"), 16)
+
+        with ArchivePool() as pool:
+            f_io = pool.fetch(uri=uri, item_path=files[1].get("path"))
+            self.assertEqual(f_io.read(), b"an inner document")
+        shutil.rmtree(os.path.dirname(uri))
+
+    def _scan(self, scanner: object, options: dict) -> list:
+        """run the scanner, the reads from the hash and zip scans
+        will move the access time between scans so it's dropped"""
+        files = list(scanner(self._root, options=options))
+        for file_dict in files:
+            file_dict.pop("accessed")
+        return files
+
 
 if __name__ == '__main__':
     unittest.main()
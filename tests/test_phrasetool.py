@@ -1,5 +1,7 @@
 """A test case for the phrase tool module"""
 import os
+import random
+import re
 import string
 import sys
 import unittest
@@ -46,6 +48,121 @@ class TestPhraseTool(unittest.TestCase):
         self.assertEqual(pr_len, 10)
         self.assertEqual(result.get("parts",[])[0].get("value"), "Protection", "First Word is not discovered")
 
+    def test_profile_many(self):
+        """the batch should match the single profiles, and use the cache"""
+        cache = PhraseTool.get_cache()
+        cache.clear()
+
+        phrases = [f"IMG_{idx % 50:04}.jpg" for idx in range(400)]
+        expected = [PhraseTool(in_phrase=phrase).get_metadata() for phrase in phrases]
+
+        profiles = PhraseTool.profile_many(phrases)
+        self.assertListEqual(profiles, expected)
+        self.assertDictEqual(cache.get_stats(),
+                {"hits": 350, "misses": 50, "size": 50, "maxsize": 65536})
+
+        # the profiles of the same phrase, and the cached profile, are not shared
+        profiles[0]["short"] = "changed"
+        self.assertEqual(profiles[50].get("short"), expected[50].get("short"))
+        self.assertEqual(PhraseTool.profile(phrases[0]).get("short"), expected[0].get("short"))
+        self.assertEqual(cache.get_stats().get("hits"), 351)
+
+        self.assertListEqual(PhraseTool.profile_many(phrases), expected)
+        self.assertEqual(cache.get_stats().get("hits"), 751)
+
+        # the process pool, with a small cache
+        cache.clear()
+        cache.set_size(10)
+        self.assertListEqual(PhraseTool.profile_many(phrases, processes=2, chunksize=8), expected)
+        self.assertEqual(len(cache), 10)
+        cache.set_size(65536)
+
+def legacy_metadata(in_phrase: str) -> dict:
+    """the prior regex per type implementation of get_metadata,
+    used as the reference for the tokenizer"""
+    regexes = {
+        "tcase": re.compile("[A-Z][a-z]+"),
+        "abbrv": re.compile("[A-Z]{2,}"),
+        "ucase": re.compile("[A-Z]+"),
+        "lcase": re.compile("[a-z]+"),
+        "code": re.compile(r"[\u4e00-\u9fff]+"),
+        "decimal": re.compile(r"\d+\.\d+"),
+        "int": re.compile(r"\d+"),
+        "group": re.compile(r"[()\[\]{}']+"),
+        "formula": re.compile(r"[,!@#$%&+=?]+"),
+        "space": re.compile(r"[\. _\-\t]+")
+    }
+    positions = {}
+    p = {}
+    for k,v in regexes.items():
+        for m in v.finditer(in_phrase):
+            l = len(m.group())
+            s = m.start()
+            e = m.end()
+            if s not in p:
+                p[s] = {
+                    "start": s,
+                    "end": e,
+                    "type": k,
+                    "value": m.group()
+                }
+                in_phrase = "{}{}{}".format(in_phrase[:s], k[0]*l, in_phrase[e:])
+                if l == 1:
+                    positions[s] = k[0]
+                else:
+                    positions[s] = "{}{}".format(k[0],l)
+
+    out_phrase = []
+    parts = []
+    for k, v in sorted(positions.items()):
+        out_phrase.append(v.upper())
+        parts.append(p.get(k))
+    pro_phrase = "".join(out_phrase)
+
+    return {
+        "parts": parts,
+        "short": re.sub('\\d','', pro_phrase),
+        "profile": pro_phrase,
+        "expand": in_phrase
+    }
+
+class TestPhraseToolEquivalence(unittest.TestCase):
+    """The tokenizer should match the prior implementation"""
+
+    _phrases = [
+        '',
+        'fileName.txt',
+        'HELLOworld',
+        'ABCdef ABc aBC',
+        'IMG_0001.jpg',
+        'scan_20220415.pdf',
+        'v1.2.3-rc.4',
+        '1.4ProtectionOfPrivacy-InformationIncidents(PrivacyBreaches)',
+        'DS9 98765',
+        '564218 - Undertaking - Anytown Road',
+        'Smalltoen Cleft - X5623771',
+        "C:\\users\\user\\files\\BLUE_CARD_VISA_CARD_1504_Oct_25-2021.pdf",
+        '报告 2022 (final) [v2] {draft} it\'s 100% @home #1 a+b=c?',
+        'tab\tsep\u00e9t\u00e9 caf\u00e9',
+    ]
+
+    def test_known_phrases(self):
+        """the sample phrases"""
+        for phrase in self._phrases:
+            with self.subTest(phrase=phrase):
+                self.assertDictEqual(PhraseTool(in_phrase=phrase).get_metadata(),
+                        legacy_metadata(phrase))
+
+    def test_random_phrases(self):
+        """random phrases over the token characters"""
+        chars = string.ascii_letters[:6] + "XYZxyz0129.._- \t()[]{}',!@#$%&+=?中文é/:~"
+        rand = random.Random(42)
+        for _ in range(5000):
+            phrase = "".join(rand.choice(chars) for _ in range(rand.randint(1, 24)))
+            self.assertDictEqual(PhraseTool(in_phrase=phrase).get_metadata(),
+                    legacy_metadata(phrase), phrase)
+
+
 if __name__ == '__main__':
     unittest.main()
 
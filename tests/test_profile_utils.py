@@ -0,0 +1,43 @@
+"""A test case for the profile index module"""
+import os
+import unittest
+import logging
+from lost_cat.utils.phrase_utils import PhraseTool
+from lost_cat.utils.profile_utils import ProfileIndex
+
+logger = logging.getLogger(__name__)
+
+class TestProfileIndex(unittest.TestCase):
+    """A container class for the profile index test cases"""
+
+    def test_profile_index(self):
+        """the queries by profile and folder, and the counts"""
+        index = ProfileIndex()
+        paths = [
+            os.path.join("data", "scans", "IMG_0001.jpg"),
+            os.path.join("data", "scans", "2022", "IMG_0002.jpg"),
+            os.path.join("data", "scans_old", "IMG_0003.jpg"),
+            os.path.join("data", "docs", "readme.txt"),
+            os.path.join("data", "docs", "notes.txt"),
+        ]
+        for path in paths:
+            index.add(key=path, file_dict={"path": path,
+                    "profile": PhraseTool.profile(os.path.basename(path))})
+
+        self.assertEqual(len(index), 5)
+        self.assertListEqual(index.top(n=1), [("ASISL", 3)])
+        self.assertEqual(len(index.query(short="ASISL")), 3)
+
+        # the folder query is the folder and sub folders, not the siblings
+        self.assertListEqual(index.query(short="ASISL", folder=os.path.join("data", "scans")),
+                paths[:2])
+        self.assertListEqual(index.query(short="LSL", folder="data"), paths[3:])
+        self.assertListEqual(index.query(short="TLI", folder="data"), [])
+
+        index.remove(key=paths[0], file_dict={"path": paths[0],
+                "profile": PhraseTool.profile("IMG_0001.jpg")})
+        self.assertEqual(index.count(short="ASISL"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""A test case for the progress events module"""
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.path_utils import count_files
+from lost_cat.utils.progress_utils import Progress, load_totals
+
+logger = logging.getLogger(__name__)
+
+class TextParser():
+    """A lifecycle parser for the text files"""
+    def get_extensions(self) -> list:
+        return [".txt"]
+
+    def set_anonimizer(self, anonimizer: dict) -> None:
+        pass
+
+    def set_export_tags(self, tags: dict) -> None:
+        pass
+
+    def set_group_tags(self, tags: dict) -> None:
+        pass
+
+    def set_alias_tags(self, tags: dict) -> None:
+        pass
+
+    def parse(self, uri: str = None, bytes_io: object = None) -> dict:
+        return {"metadata": {"parsed": True}, "grouping": {"kind": "text"}}
+
+    def close(self) -> None:
+        pass
+
+class TestProgress(unittest.TestCase):
+    """A container class for the progress event test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """build a small tree of files"""
+        cls._root = tempfile.mkdtemp()
+        cls._src = os.path.join(cls._root, "src")
+        for folder in ["a", "b"]:
+            os.makedirs(os.path.join(cls._src, folder))
+            for idx in range(5):
+                with open(os.path.join(cls._src, folder, f"notes_{idx}.txt"), "w") as f_io:
+                    f_io.write("lost cat " * idx)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._root)
+
+    def test_rate_limit(self):
+        """the events are sent at most once per interval"""
+        events = []
+        progress = Progress(run="test", callbacks=[events.append], interval=3600, stride=1,
+                total=1000)
+        for _ in range(500):
+            progress.update(size=10, folder="/data")
+        self.assertListEqual(events, [])
+
+        event = progress.finish()
+        self.assertListEqual(events, [event])
+        self.assertEqual(event.get("files"), 500)
+        self.assertEqual(event.get("bytes"), 5000)
+        self.assertEqual(event.get("folder"), "/data")
+        self.assertTrue(event.get("done"))
+
+        # every update is past the interval
+        events = []
+        progress = Progress(run="test", callbacks=[events.append], interval=0, stride=2,
+                total=10)
+        for _ in range(4):
+            progress.update()
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[-1].get("files"), 4)
+        self.assertGreaterEqual(events[-1].get("eta"), 0.0)
+
+    def test_runs(self):
+        """the catalog and process runs send the events, and the totals
+        are saved for the eta of the next run"""
+        self.assertEqual(count_files(uri=self._src), 10)
+
+        uri = os.path.join(self._root, "totals.json")
+        events = []
+        options = {"profile": True, "stats": True,
+                "progress": {"callback": events.append, "interval": 0, "stride": 1,
+                    "precount": True, "totals": uri}}
+        lc_obj = LostCat(options=options)
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.add_parser(label="text", base_class=TextParser)
+        lc_obj.catalog_artifacts()
+        lc_obj.process_artifacts()
+
+        catalog = [e for e in events if e.get("run") == "catalog"]
+        process = [e for e in events if e.get("run") == "process"]
+        self.assertEqual(len(catalog), 11)
+        self.assertEqual(catalog[0].get("total"), 10)
+        self.assertEqual(catalog[-1].get("files"), 10)
+        self.assertEqual(process[-1].get("total"), 10)
+        self.assertEqual(process[-1].get("files"), 10)
+        self.assertEqual(load_totals(uri=uri).get("catalog").get("files"), 10)
+
+        # the pipeline uses the saved totals, and adds the queue depths
+        events.clear()
+        options["progress"]["precount"] = False
+        lc_obj = LostCat(options=options)
+        lc_obj.add_source(label="test", uri=self._src)
+        lc_obj.add_parser(label="text", base_class=TextParser)
+        lc_obj.run_pipeline()
+
+        catalog = [e for e in events if e.get("run") == "catalog"]
+        self.assertEqual(catalog[0].get("total"), 10)
+        self.assertEqual(catalog[0].get("totalbytes"), load_totals(uri=uri).get(
+                "catalog").get("bytes"))
+        self.assertIn("units", catalog[0].get("queues"))
+        self.assertTrue(events[-1].get("done"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""A test case for the compact file record module"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import logging
+from lost_cat.lost_cat import LostCat
+from lost_cat.utils.path_utils import get_file_metadata
+from lost_cat.utils.record_utils import FileRecord
+
+logger = logging.getLogger(__name__)
+
+class TestFileRecord(unittest.TestCase):
+    """A container class for the file record test cases"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the test folder"""
+        cls._path = tempfile.mkdtemp()
+        for idx in range(5):
+            with open(os.path.join(cls._path, f"Report_{idx:02}.txt"), "w") as f_io:
+                f_io.write("report " * idx)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the test folder"""
+        shutil.rmtree(cls._path)
+
+    def test_record(self):
+        """the record reads as the file dict, and converts back"""
+        options = {"profile": True, "stats": True}
+        uri = os.path.join(self._path, "Report_01.txt")
+        file_dict = get_file_metadata(uri=uri, options=options)
+        epoch_dict = get_file_metadata(uri=uri, options=dict(options, epoch=True))
+
+        record = FileRecord.from_dict(file_dict=epoch_dict, options=options)
+        self.assertDictEqual(record.to_dict(), file_dict)
+        self.assertEqual(record.get("profile"), file_dict.get("profile"))
+        self.assertIsInstance(record.modified, int)
+
+        # the repeated strings are shared, the other keys are held
+        other = FileRecord.from_dict(file_dict=get_file_metadata(
+                uri=os.path.join(self._path, "Report_02.txt"), options=options))
+        self.assertIs(record.folder, other.folder)
+        record["hash"] = {"MD5": "abc"}
+        record["custom"] = 1
+        del record["profile"]
+        self.assertEqual(record.get("custom"), 1)
+        self.assertNotIn("profile", record)
+        self.assertEqual(pickle.loads(pickle.dumps(record)).to_dict(), record.to_dict())
+
+        with self.assertRaises(AttributeError):
+            record.other = 1
+
+    def test_catalog_compact(self):
+        """the compact catalog matches the file dict catalog"""
+        catalogs = []
+        for compact in [False, True]:
+            lc_obj = LostCat(options={"profile": True, "stats": True, "compact": compact})
+            lc_obj.add_source(label="test", uri=self._path)
+            lc_obj.catalog_artifacts()
+            catalogs.append({k: dict(v) for k, v in lc_obj.fetch_catalog().get("files").items()})
+
+        for files in catalogs:
+            for file_dict in files.values():
+                file_dict.pop("accessed")
+        self.assertDictEqual(catalogs[0], catalogs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
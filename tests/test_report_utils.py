@@ -0,0 +1,62 @@
+"""A test case for the catalog summary report module"""
+import unittest
+import logging
+from unittest import mock
+from lost_cat.utils import column_utils, report_utils
+from lost_cat.utils.column_utils import CatalogColumns
+from lost_cat.utils.report_utils import REPORT_COLUMNS, build_summary
+
+logger = logging.getLogger(__name__)
+
+# the reports are tested with numpy, if installed, and the pure python loops
+NUMPY = {report_utils.numpy, None}
+
+NOW = 1650000000.0
+DAY = 86400
+
+class TestSummaryReport(unittest.TestCase):
+    """A container class for the summary report test cases"""
+
+    def test_summary(self):
+        """the histogram, totals, ages and largest files"""
+        files = {
+            "/data/a.txt": {"path": "/data/a.txt", "folder": "/data", "ext": ".txt",
+                    "size": 0, "modified": NOW - 0.5 * DAY},
+            "/data/b.txt": {"path": "/data/b.txt", "folder": "/data", "ext": ".txt",
+                    "size": 100, "modified": NOW - 3 * DAY},
+            "/data/docs/c.pdf": {"path": "/data/docs/c.pdf", "folder": "/data/docs",
+                    "ext": ".pdf", "size": 5000, "modified": NOW - 400 * DAY},
+            "/data/docs/d.pdf": {"path": "/data/docs/d.pdf", "folder": "/data/docs",
+                    "ext": ".pdf", "size": 70000, "modified": NOW - 5000 * DAY},
+            "/data/e.zip!/x.txt": {"path": "x.txt", "zipfile": "/data/e.zip",
+                    "ext": ".txt"},
+        }
+        for numpy in NUMPY:
+            with self.subTest(numpy=numpy is not None), \
+                    mock.patch.object(column_utils, "numpy", numpy), \
+                    mock.patch.object(report_utils, "numpy", numpy):
+                # only the report columns are built, and match the full columns
+                options = {"reporttop": 2, "reportages": [1, 30, 365], "reportnow": NOW}
+                report = build_summary(columns=CatalogColumns.from_files(files=files,
+                        names=REPORT_COLUMNS), options=options)
+                self.assertDictEqual(build_summary(columns=CatalogColumns.from_files(
+                        files=files), options=options), report)
+
+                self.assertEqual(report.get("files"), 5)
+                self.assertEqual(report.get("bytes"), 75100)
+                self.assertListEqual([(b.get("min"), b.get("files"))
+                        for b in report.get("sizes")], [(0, 1), (64, 1), (4096, 1), (65536, 1)])
+                self.assertDictEqual(report.get("ext"), {
+                    ".txt": {"files": 3, "bytes": 100},
+                    ".pdf": {"files": 2, "bytes": 75000}
+                })
+                self.assertDictEqual(report.get("folder").get("/data/docs"),
+                        {"files": 2, "bytes": 75000})
+                self.assertListEqual([(a.get("days"), a.get("files"))
+                        for a in report.get("ages")], [(1, 1), (30, 1), (365, 0), (None, 2)])
+                self.assertListEqual(report.get("largest"),
+                        [("/data/docs/d.pdf", 70000), ("/data/docs/c.pdf", 5000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""A test case for the artifact store module"""
+import unittest
+import logging
+from lost_cat.utils.store_utils import ArtifactStore, SQLiteArtifactStore, build_store
+
+logger = logging.getLogger(__name__)
+
+class TestArtifactStore(unittest.TestCase):
+    """A container class for the artifact store test cases"""
+
+    def test_sqlite_store(self):
+        """the store should behave as the dict"""
+        store = build_store(options={"store": "sqlite", "storebatch": 7})
+        self.assertIsInstance(store, SQLiteArtifactStore)
+
+        expected = {}
+        for idx in range(25):
+            file_dict = {
+                "path": f"/data/file_{idx}.{'txt' if idx % 2 else 'dcm'}",
+                "ext": ".txt" if idx % 2 else ".dcm",
+                "hash": {"MD5": f"{idx % 5}"}
+            }
+            expected[file_dict.get("path")] = file_dict
+            store[file_dict.get("path")] = file_dict
+
+        self.assertEqual(len(store), 25)
+        self.assertIn("/data/file_3.txt", store)
+        self.assertDictEqual(dict(store.items()), expected)
+
+        # updates while iterating are kept, and the rows are not revisited
+        for path, file_dict in store.items():
+            file_dict["metadata"] = {"seen": path}
+            store[path] = file_dict
+        self.assertEqual(len(list(store.values())), 25)
+        self.assertEqual(store["/data/file_3.txt"].get("metadata"), {"seen": "/data/file_3.txt"})
+
+        self.assertEqual(len(list(store.find(ext=".dcm"))), 13)
+        self.assertEqual(len(list(store.find(hashes={"MD5": "1"}))), 5)
+
+        del store["/data/file_3.txt"]
+        self.assertNotIn("/data/file_3.txt", store)
+        store.close()
+
+    def test_abstract(self):
+        """a store that does not implement the methods can't be created"""
+        class PartialStore(ArtifactStore):
+            def _get(self, key: str) -> dict:
+                return None
+
+        self.assertRaises(TypeError, ArtifactStore)
+        self.assertRaises(TypeError, PartialStore)
+
+
+if __name__ == '__main__':
+    unittest.main()